@@ -0,0 +1,51 @@
+"""
+Shared BTC Indicator Base
+The BTC signal trainers derive different signals from the same EMAs,
+RSI, MACD, Bollinger bands, ATR and price ranges. These are computed once
+per price series and cached on disk, keyed by a hash of the input arrays,
+so the second trainer (and every retrain on unchanged data) reuses them.
+"""
+
+from pathlib import Path
+
+import numpy as np
+from joblib import Memory
+
+from ai.indicators import (
+    ewm_mean, rolling_mean, rolling_mean_std, rolling_max, rolling_min,
+    rsi, true_range,
+)
+
+
+# Uncompressed so cached arrays are memory-mapped instead of copied on load
+memory = Memory(Path(__file__).parent.parent / ".cache" / "features", mmap_mode='r', verbose=0)
+
+EMA_SPANS = (9, 12, 20, 21, 26, 50, 200)
+
+
+@memory.cache
+def base_indicators(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                    volume: np.ndarray) -> dict:
+    """
+    Indicators shared by the BTC trainers, as float64 arrays.
+
+    Returns:
+        Dict with ``ema{span}`` for every span in EMA_SPANS plus
+        ``macd, macd_sig, rsi14, sma20, std20, atr14, vol_ma20,
+        high20, low20, low10``. Cached arrays come back memory-mapped
+        read-only, so callers must not modify them in place.
+    """
+    base = dict(zip((f'ema{s}' for s in EMA_SPANS), ewm_mean(close, EMA_SPANS).T))
+
+    base['macd'] = base['ema12'] - base['ema26']
+    base['macd_sig'] = ewm_mean(base['macd'], [9])[:, 0]
+
+    base['rsi14'] = rsi(close, 14)
+
+    base['sma20'], base['std20'] = rolling_mean_std(close, 20)
+    base['atr14'] = rolling_mean(true_range(high, low, close), 14)
+    base['vol_ma20'] = rolling_mean(volume, 20)
+    base['high20'] = rolling_max(high, 20)
+    base['low20'] = rolling_min(low, 20)
+    base['low10'] = rolling_min(low, 10)
+    return base
@@ -0,0 +1,23 @@
+"""
+Optional Numba JIT support for indicator kernels.
+Falls back to plain Python when numba is not installed.
+"""
+
+try:
+    from numba import njit, prange, set_num_threads
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def set_num_threads(n):
+        """No-op stand-in for numba.set_num_threads"""
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
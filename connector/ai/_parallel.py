@@ -0,0 +1,35 @@
+"""
+Thread budgeting for scikit-learn forest training.
+Trees are fitted on joblib threads; BLAS threads spawned inside each fit
+only compete with them for the same cores.
+"""
+
+import os
+
+from threadpoolctl import threadpool_limits
+
+
+# Processes training side by side on this machine; set inside pool workers
+_process_share = 1
+
+
+def share_cores(n_processes: int):
+    """Split the physical cores between n_processes concurrent training workers"""
+    global _process_share
+    _process_share = max(n_processes, 1)
+
+
+def physical_cores() -> int:
+    """Physical cores available to this process's share of the machine"""
+    # os.cpu_count() reports logical cores; assume 2-way SMT
+    return max((os.cpu_count() or 1) // 2 // _process_share, 1)
+
+
+def forest_n_jobs(n_estimators: int) -> int:
+    """Jobs for a forest fit: one per physical core, never more than one per tree"""
+    return max(min(physical_cores(), n_estimators), 1)
+
+
+def single_thread_blas():
+    """Context manager capping BLAS at one thread for the duration of a fit"""
+    return threadpool_limits(limits=1, user_api='blas')
@@ -0,0 +1,30 @@
+"""
+Chronological train/test split and feature scaling for the trainers.
+Bars are ordered in time, so the test rows are always the latest ones.
+"""
+
+import math
+
+import numpy as np
+
+
+def chrono_split_scale(X, y, scaler, test_size=0.2):
+    """
+    Split X/y chronologically and scale both halves with scaler.
+
+    The split falls at train_test_split(test_size=test_size, shuffle=False)'s
+    boundary, but the halves are views, so no rows are copied. The scaler is
+    fitted on the training rows only. It transforms in float64 (in place when X
+    is writable), the dtype the saved scaler sees on live features; the models
+    get float32 copies to build trees on.
+
+    Returns (X_train_scaled, X_test_scaled, y_train, y_test).
+    """
+    cut = len(X) - math.ceil(len(X) * test_size)
+    X_train, X_test = X[:cut], X[cut:]
+    y_train, y_test = y[:cut], y[cut:]
+
+    scaler.fit(X_train)
+    X_train_scaled = scaler.transform(X_train, copy=False).astype(np.float32)
+    X_test_scaled = scaler.transform(X_test, copy=False).astype(np.float32)
+    return X_train_scaled, X_test_scaled, y_train, y_test
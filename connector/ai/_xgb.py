@@ -0,0 +1,48 @@
+"""
+XGBoost device selection and early-stopped fitting for the trainers.
+Trees are built on the GPU when the xgboost build has CUDA support and
+cupy sees a device; otherwise the CPU hist builder is used.
+"""
+
+import math
+
+import xgboost as xgb
+
+
+def _cuda_available() -> bool:
+    """True when xgboost can train on a visible CUDA device"""
+    if not xgb.build_info().get('USE_CUDA'):
+        return False
+    try:
+        import cupy
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+XGB_DEVICE = 'cuda' if _cuda_available() else 'cpu'
+
+
+def device_params() -> dict:
+    """tree_method/device keyword arguments for XGBClassifier"""
+    return {'tree_method': 'hist', 'device': XGB_DEVICE}
+
+
+def to_cpu(model):
+    """Point a fitted XGBoost model at the CPU so its pickle predicts on any machine"""
+    model.set_params(device='cpu')
+    return model
+
+
+def fit_early_stopped(model, X_train, y_train, frac=0.1):
+    """
+    Fit an XGBoost model with early stopping on the chronological tail of the
+    training rows, so the test split stays unseen until evaluation.
+
+    The model needs early_stopping_rounds set. It is returned pointed at the
+    CPU, where it is evaluated and saved and where the live app predicts.
+    """
+    val = len(X_train) - math.ceil(len(X_train) * frac)
+    model.fit(X_train[:val], y_train[:val],
+              eval_set=[(X_train[val:], y_train[val:])], verbose=False)
+    return to_cpu(model)
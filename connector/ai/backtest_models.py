@@ -5,21 +5,54 @@ Simulates actual trading with:
 - Realistic entry/exit
 - Position sizing
 - Win/Loss tracking
+
+Run from the connector directory: python -m ai.backtest_models
 """
 
-import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import warnings
-warnings.filterwarnings('ignore')
+from typing import Optional
 
 import numpy as np
 import pandas as pd
 import joblib
+import xgboost as xgb
 from sklearn.preprocessing import StandardScaler
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
+from ai.indicators import (
+    ewm_mean, rolling_mean, rolling_means, rolling_mean_std, rolling_max, rolling_min, rolling_quantile,
+    true_range, pct_change, diff, shift, run_length, momentum_stack,
+    zscore_columns,
+)
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv, parse_xau_csv
+from ai._njit import set_num_threads
+
+
+# Feature columns produced by each indicator block of ModelBacktester
+FEATURE_BLOCKS = {
+    'momentum': frozenset({'momentum_1', 'momentum_2', 'momentum_4', 'momentum', 'accel', 'jerk',
+                           'momentum_accel'}),
+    'rsi': frozenset({'rsi_5', 'rsi_7', 'rsi_14', 'rsi', 'rsi_fast', 'rsi_direction', 'rsi_rising',
+                      'rsi_level', 'rsi_momentum', 'rsi_setup'}),
+    'macd': frozenset({'macd', 'macd_signal', 'macd_hist', 'macd_cross', 'macd_bullish', 'macd_momentum',
+                       'macd_direction'}),
+    'ema': frozenset({'ema_micro', 'ema_slope', 'ema_momentum', 'ema_alignment', 'ema_stack',
+                      'trend_aligned', 'micro_trend', 'trend_bullish'}),
+    'bollinger': frozenset({'bb_position', 'bb_width'}),
+    'volume': frozenset({'volume_spike', 'volume_surge', 'volume_surge_pct', 'volume_trend',
+                         'volume_confirms'}),
+    'volatility': frozenset({'volatility_now', 'vol_expansion', 'atr_spike'}),
+    'candle': frozenset({'candle_body', 'candle_wick_ratio'}),
+    'price_strength': frozenset({'price_strength', 'price_position', 'breakout', 'breakout_up'}),
+    'support': frozenset({'price_near_support'}),
+    'burst': frozenset({'momentum_burst', 'burst_strength', 'burst_duration', 'price_accel',
+                        'accel_positive'}),
+    'trend_strength': frozenset({'trend_strength'}),
+}
+KNOWN_FEATURES = frozenset().union(*FEATURE_BLOCKS.values())
 
 
 class ModelBacktester:
@@ -30,161 +63,211 @@ class ModelBacktester:
     def __init__(self, ohlcv_dir: Path = None):
         self.ohlcv_dir = ohlcv_dir or Path(__file__).parent.parent.parent / "ohlcv"
         self.security = ModelSecurity()
+        # Parsed OHLCV per data file, shared by every model in backtest_all
+        self._ohlcv_cache: dict = {}
+        # Full normalized feature matrix per test window
+        self._features_cache: dict = {}
+    
+    @staticmethod
+    def _data_key(symbol: str) -> str:
+        """OHLCV data file a symbol is backtested on"""
+        return 'btc' if 'btc' in symbol.lower() else 'xauusd'
     
     def load_ohlcv(self, symbol: str) -> pd.DataFrame:
-        """Load OHLCV data for backtesting"""
-        if 'btc' in symbol.lower():
-            path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
-            df = pd.read_csv(path)
-            df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-            df = df.rename(columns={'open_time': 'time'})
-            df['time'] = pd.to_datetime(df['time'].str.strip())
-        else:
-            path = self.ohlcv_dir / "xauusd" / "XAU_15m_data.csv"
-            df = pd.read_csv(path, sep=';')
-            df.columns = [c.strip().lower() for c in df.columns]
-            df = df.rename(columns={'date': 'time'})
-            df['time'] = pd.to_datetime(df['time'])
-        
-        df = df.sort_values('time').reset_index(drop=True)
-        return df
+        """Load OHLCV data for backtesting (cached per data file)"""
+        key = self._data_key(symbol)
+        if key not in self._ohlcv_cache:
+            if key == 'btc':
+                path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
+                self._ohlcv_cache[key] = load_csv_cached(path, parse_btc_csv)
+            else:
+                path = self.ohlcv_dir / "xauusd" / "XAU_15m_data.csv"
+                self._ohlcv_cache[key] = load_csv_cached(path, parse_xau_csv)
+        return self._ohlcv_cache[key]
     
     def calc_features(self, df: pd.DataFrame, feature_list: list) -> pd.DataFrame:
         """Calculate features based on model requirements"""
-        f = pd.DataFrame(index=df.index)
-        
-        c = df['close'].astype(float)
-        o = df['open'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        v = df['volume'].astype(float) if 'volume' in df.columns else pd.Series(1, index=df.index)
-        
-        # Calculate all possible features
-        # Momentum
-        f['momentum_1'] = c.pct_change(1) * 100
-        f['momentum_2'] = c.pct_change(2) * 100
-        f['momentum_4'] = c.pct_change(4) * 100
-        f['momentum'] = c.pct_change(8) * 100
-        f['accel'] = f['momentum_1'].diff()
-        f['jerk'] = f['accel'].diff()
-        f['momentum_accel'] = f['momentum'].diff(4) if 'momentum' in f else 0
-        
-        # RSI variants
-        delta = c.diff()
-        for period in [5, 7, 14]:
-            gain = delta.where(delta > 0, 0).rolling(period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
-            rs = gain / (loss + 1e-10)
-            rsi = 100 - (100 / (1 + rs))
-            f[f'rsi_{period}'] = rsi
-        f['rsi'] = f['rsi_14']
-        f['rsi_fast'] = f['rsi_5']
-        f['rsi_direction'] = f['rsi_fast'].diff(2)
-        f['rsi_rising'] = (f['rsi'] > f['rsi'].shift(2)).astype(float)
-        f['rsi_level'] = f['rsi'] / 100
-        f['rsi_momentum'] = f['rsi'].diff(3)
-        f['rsi_setup'] = ((f['rsi'] > 30) & (f['rsi'] < 60) & (f['rsi'] > f['rsi'].shift(3))).astype(float)
-        
-        # MACD
-        ema12 = c.ewm(span=12).mean()
-        ema26 = c.ewm(span=26).mean()
-        macd = ema12 - ema26
-        macd_sig = macd.ewm(span=9).mean()
-        f['macd'] = macd / c * 100
-        f['macd_signal'] = macd_sig / c * 100
-        f['macd_hist'] = (macd - macd_sig) / c * 100
-        f['macd_cross'] = ((macd > macd_sig) != (macd.shift(1) > macd_sig.shift(1))).astype(float)
-        f['macd_bullish'] = (macd > macd_sig).astype(float)
-        f['macd_momentum'] = macd - macd_sig
-        f['macd_direction'] = np.sign(f['macd_hist'].diff(3))
-        
-        # EMAs
-        ema5 = c.ewm(span=5).mean()
-        ema9 = c.ewm(span=9).mean()
-        ema10 = c.ewm(span=10).mean()
-        ema20 = c.ewm(span=20).mean()
-        ema21 = c.ewm(span=21).mean()
-        ema50 = c.ewm(span=50).mean()
-        ema200 = c.ewm(span=200).mean()
-        
-        f['ema_micro'] = (ema5 - ema10) / c * 100
-        f['ema_slope'] = ema5.pct_change(2) * 100
-        f['ema_momentum'] = (c - ema21) / ema21 * 100
-        f['ema_alignment'] = ((ema9 > ema21) & (ema21 > ema50)).astype(float) - \
-                            ((ema9 < ema21) & (ema21 < ema50)).astype(float)
-        f['ema_stack'] = ((ema20 > ema50) & (ema50 > ema200)).astype(float)
-        f['trend_aligned'] = np.sign(c - ema10) * np.sign(ema10 - ema20)
-        f['micro_trend'] = np.sign(c.diff(3))
-        f['trend_bullish'] = ((c > ema20) & (ema20 > ema50)).astype(float)
-        
-        # Bollinger Bands
-        sma20 = c.rolling(20).mean()
-        std20 = c.rolling(20).std()
-        bb_up = sma20 + 2 * std20
-        bb_lo = sma20 - 2 * std20
-        f['bb_position'] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
-        f['bb_width'] = (bb_up - bb_lo) / sma20
-        
-        # Volume
-        vol_ma = v.rolling(10).mean()
-        vol_ma_20 = v.rolling(20).mean()
-        f['volume_spike'] = v / (vol_ma + 1e-10)
-        f['volume_surge'] = (v > vol_ma * 2).astype(float)
-        f['volume_surge_pct'] = v / (vol_ma + 1)
-        f['volume_trend'] = vol_ma.pct_change(3)
-        f['volume_confirms'] = (v > vol_ma_20).astype(float)
-        
-        # ATR / Volatility
-        tr = pd.concat([h - l, abs(h - c.shift()), abs(l - c.shift())], axis=1).max(axis=1)
-        atr = tr.rolling(10).mean()
-        f['volatility_now'] = (h - l) / c * 100
-        f['vol_expansion'] = (tr > atr * 1.5).astype(float)
-        f['atr_spike'] = tr / (atr + 1e-10)
-        
-        # Candle
-        body = abs(c - o)
-        range_ = h - l + 1e-10
-        f['candle_body'] = body / range_
-        upper_wick = h - np.maximum(c, o)
-        lower_wick = np.minimum(c, o) - l
-        f['candle_wick_ratio'] = (upper_wick - lower_wick) / range_
-        
-        # Trend / Price strength
-        high_20 = h.rolling(20).max()
-        low_20 = l.rolling(20).min()
-        f['price_strength'] = (c - low_20) / (high_20 - low_20 + 1e-10)
-        f['price_position'] = f['price_strength']
-        f['breakout'] = ((c > high_20.shift(1)) | (c < low_20.shift(1))).astype(float)
-        f['breakout_up'] = (c > high_20.shift(1)).astype(float)
-        
-        # Price near support
-        low_10 = l.rolling(10).min()
-        f['price_near_support'] = (c < low_10 * 1.01).astype(float)
-        
-        # Momentum burst
-        pct_1 = c.pct_change(1).abs() * 100
-        pct_2 = c.pct_change(2).abs() * 100
-        avg_move = pct_2.rolling(20).mean()
-        f['momentum_burst'] = (pct_2 > avg_move * 2).astype(float)
-        f['burst_strength'] = pct_2 / (avg_move + 0.01)
-        strong_move = pct_1 > pct_1.rolling(20).quantile(0.8)
-        f['burst_duration'] = strong_move.groupby((~strong_move).cumsum()).cumcount()
-        f['price_accel'] = f['momentum_1'] - f['momentum_1'].shift(1)
-        f['accel_positive'] = (f['price_accel'] > 0).astype(float)
-        
-        # Trend strength
-        plus_dm = ((h - h.shift()).where((h - h.shift()) > (l.shift() - l), 0)).rolling(14).mean()
-        minus_dm = ((l.shift() - l).where((l.shift() - l) > (h - h.shift()), 0)).rolling(14).mean()
-        dx = abs(plus_dm - minus_dm) / (plus_dm + minus_dm + 1e-10)
-        f['trend_strength'] = dx
-        
-        # Normalize
-        for col in f.columns:
-            if f[col].std() > 0 and f[col].dtype != bool:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
-        
+        f = self.calc_all_features(df, feature_list)
         return f[[c for c in feature_list if c in f.columns]]
     
+    def calc_all_features(self, df: pd.DataFrame, feature_subset: Optional[list] = None) -> pd.DataFrame:
+        """
+        Calculate and normalize every supported feature, or only the
+        indicator blocks that feed feature_subset when it is given
+        """
+        if feature_subset is None:
+            blocks = set(FEATURE_BLOCKS)
+        else:
+            wanted = set(feature_subset)
+            blocks = {name for name, cols in FEATURE_BLOCKS.items() if wanted & cols}
+        
+        # float32 throughout: features are z-scored ratios, FP64 precision is wasted
+        c = df['close'].to_numpy(dtype=np.float32)
+        o = df['open'].to_numpy(dtype=np.float32)
+        h = df['high'].to_numpy(dtype=np.float32)
+        l = df['low'].to_numpy(dtype=np.float32)
+        v = df['volume'].to_numpy(dtype=np.float32) if 'volume' in df.columns else np.ones(len(df), dtype=np.float32)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            feats = self._feature_arrays(o, h, l, c, v, blocks)
+        names = list(feats)
+        # Column-major, so each column is normalized from one contiguous block
+        arr = np.empty((len(df), len(names)), dtype=np.float32, order='F')
+        for j, name in enumerate(names):
+            arr[:, j] = feats[name]
+        
+        # Normalize all columns in one parallel pass
+        zscore_columns(arr)
+        return pd.DataFrame(arr, columns=names, index=df.index)
+    
+    @staticmethod
+    def _feature_arrays(o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray, v: np.ndarray,
+                        blocks: set) -> dict:
+        """
+        Raw (unnormalized) feature columns of the requested blocks.
+        Boolean flags are int8; everything else (including np.sign
+        columns, which are NaN during warm-up) is float32.
+        """
+        f = {}
+        
+        if 'momentum' in blocks or 'burst' in blocks:
+            # Percent change over 1/2/4/8 bars in a single pass over c
+            mom = momentum_stack(c, (1, 2, 4, 8))
+            momentum_1 = mom[:, 0]
+        
+        if 'momentum' in blocks:
+            f['momentum_1'] = momentum_1
+            f['momentum_2'] = mom[:, 1]
+            f['momentum_4'] = mom[:, 2]
+            f['momentum'] = mom[:, 3]
+            f['accel'] = diff(momentum_1)
+            f['jerk'] = diff(f['accel'])
+            f['momentum_accel'] = diff(f['momentum'], 4)
+        
+        if 'rsi' in blocks:
+            # Gains/losses are period-independent; all three windows share one pass
+            periods = [5, 7, 14]
+            delta = diff(c)
+            gains = rolling_means(np.where(delta > 0, delta, np.float32(0)), periods)
+            losses = rolling_means(-np.where(delta < 0, delta, np.float32(0)), periods)
+            rs = gains / (losses + 1e-10)
+            rsis = 100 - (100 / (1 + rs))
+            for k, period in enumerate(periods):
+                f[f'rsi_{period}'] = rsis[:, k]
+            rsi = f['rsi'] = f['rsi_14']
+            f['rsi_fast'] = f['rsi_5']
+            f['rsi_direction'] = diff(f['rsi_fast'], 2)
+            f['rsi_rising'] = (rsi > shift(rsi, 2)).astype(np.int8)
+            f['rsi_level'] = rsi / 100
+            f['rsi_momentum'] = diff(rsi, 3)
+            f['rsi_setup'] = ((rsi > 30) & (rsi < 60) & (rsi > shift(rsi, 3))).astype(np.int8)
+        
+        if 'ema' in blocks or 'macd' in blocks:
+            # EMAs for all spans in one pass
+            emas = ewm_mean(c, [5, 9, 10, 12, 20, 21, 26, 50, 200])
+            ema5, ema9, ema10, ema12, ema20, ema21, ema26, ema50, ema200 = emas.T
+        
+        if 'macd' in blocks:
+            macd = ema12 - ema26
+            macd_sig = ewm_mean(macd, [9])[:, 0]
+            bullish = macd > macd_sig
+            f['macd'] = macd / c * 100
+            f['macd_signal'] = macd_sig / c * 100
+            f['macd_hist'] = (macd - macd_sig) / c * 100
+            f['macd_cross'] = (bullish != (shift(macd, 1) > shift(macd_sig, 1))).astype(np.int8)
+            f['macd_bullish'] = bullish.astype(np.int8)
+            f['macd_momentum'] = macd - macd_sig
+            f['macd_direction'] = np.sign(diff(f['macd_hist'], 3))
+        
+        if 'ema' in blocks:
+            f['ema_micro'] = (ema5 - ema10) / c * 100
+            f['ema_slope'] = pct_change(ema5, 2) * 100
+            f['ema_momentum'] = (c - ema21) / ema21 * 100
+            f['ema_alignment'] = ((ema9 > ema21) & (ema21 > ema50)).astype(np.int8) - \
+                                ((ema9 < ema21) & (ema21 < ema50)).astype(np.int8)
+            f['ema_stack'] = ((ema20 > ema50) & (ema50 > ema200)).astype(np.int8)
+            f['trend_aligned'] = np.sign(c - ema10) * np.sign(ema10 - ema20)
+            f['micro_trend'] = np.sign(diff(c, 3))
+            f['trend_bullish'] = ((c > ema20) & (ema20 > ema50)).astype(np.int8)
+        
+        if 'bollinger' in blocks:
+            sma20, std20 = rolling_mean_std(c, 20)
+            bb_up = sma20 + 2 * std20
+            bb_lo = sma20 - 2 * std20
+            f['bb_position'] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
+            f['bb_width'] = (bb_up - bb_lo) / sma20
+        
+        if 'volume' in blocks:
+            vol_ma = rolling_mean(v, 10)
+            vol_ma_20 = rolling_mean(v, 20)
+            f['volume_spike'] = v / (vol_ma + 1e-10)
+            f['volume_surge'] = (v > vol_ma * 2).astype(np.int8)
+            f['volume_surge_pct'] = v / (vol_ma + 1)
+            f['volume_trend'] = pct_change(vol_ma, 3)
+            f['volume_confirms'] = (v > vol_ma_20).astype(np.int8)
+        
+        if 'volatility' in blocks:
+            tr = true_range(h, l, c)
+            atr = rolling_mean(tr, 10)
+            f['volatility_now'] = (h - l) / c * 100
+            f['vol_expansion'] = (tr > atr * 1.5).astype(np.int8)
+            f['atr_spike'] = tr / (atr + 1e-10)
+        
+        if 'candle' in blocks:
+            body = np.abs(c - o)
+            range_ = h - l + 1e-10
+            f['candle_body'] = body / range_
+            upper_wick = h - np.maximum(c, o)
+            lower_wick = np.minimum(c, o) - l
+            f['candle_wick_ratio'] = (upper_wick - lower_wick) / range_
+        
+        if 'price_strength' in blocks:
+            high_20 = rolling_max(h, 20)
+            low_20 = rolling_min(l, 20)
+            f['price_strength'] = (c - low_20) / (high_20 - low_20 + 1e-10)
+            f['price_position'] = f['price_strength']
+            breakout_up = c > shift(high_20, 1)
+            f['breakout'] = (breakout_up | (c < shift(low_20, 1))).astype(np.int8)
+            f['breakout_up'] = breakout_up.astype(np.int8)
+        
+        if 'support' in blocks:
+            low_10 = rolling_min(l, 10)
+            f['price_near_support'] = (c < low_10 * 1.01).astype(np.int8)
+        
+        if 'burst' in blocks:
+            pct_1 = np.abs(momentum_1)
+            pct_2 = np.abs(mom[:, 1])
+            avg_move = rolling_mean(pct_2, 20)
+            f['momentum_burst'] = (pct_2 > avg_move * 2).astype(np.int8)
+            f['burst_strength'] = pct_2 / (avg_move + 0.01)
+            strong_move = pct_1 > rolling_quantile(pct_1, 20, 0.8)
+            f['burst_duration'] = run_length(strong_move)
+            f['price_accel'] = momentum_1 - shift(momentum_1, 1)
+            f['accel_positive'] = (f['price_accel'] > 0).astype(np.int8)
+        
+        if 'trend_strength' in blocks:
+            up_move = diff(h)
+            down_move = -diff(l)
+            plus_dm = rolling_mean(np.where(up_move > down_move, up_move, np.float32(0)), 14)
+            minus_dm = rolling_mean(np.where(down_move > up_move, down_move, np.float32(0)), 14)
+            f['trend_strength'] = np.abs(plus_dm - minus_dm) / (plus_dm + minus_dm + 1e-10)
+        
+        return f
+    
+    @staticmethod
+    def _predict_proba(model, X: np.ndarray) -> np.ndarray:
+        """Class probabilities; xgboost models predict in place without a DMatrix"""
+        if isinstance(model, xgb.XGBClassifier) and model.objective in ('binary:logistic', 'multi:softprob'):
+            try:
+                iteration_range = (0, model.best_iteration + 1)
+            except AttributeError:
+                iteration_range = (0, 0)
+            proba = model.get_booster().inplace_predict(X, iteration_range=iteration_range)
+            if proba.ndim == 1:
+                proba = np.column_stack([1 - proba, proba])
+            return proba
+        return model.predict_proba(X)
+    
     def backtest_model(self, model_path: Path) -> dict:
         """Backtest a single model"""
         print(f"\n{'='*60}")
@@ -216,6 +299,10 @@ class ModelBacktester:
         print(f"Threshold: {threshold:.0%}")
         print(f"Features: {len(features)}")
         
+        unknown = set(features) - KNOWN_FEATURES
+        if unknown:
+            return {'error': f'Unknown features {sorted(unknown)}', 'model': model_path.name}
+        
         # Load data
         df = self.load_ohlcv(symbol)
         
@@ -226,8 +313,17 @@ class ModelBacktester:
         print(f"Test period: {df_test['time'].iloc[0]} to {df_test['time'].iloc[-1]}")
         print(f"Test samples: {len(df_test)}")
         
-        # Calculate features
-        feat_df = self.calc_features(df_test, features)
+        # Calculate features (once per test window, shared by all models on it).
+        # Only the indicator blocks not already cached for this window are computed.
+        cache_key = (self._data_key(symbol), test_size, len(df))
+        cached = self._features_cache.get(cache_key)
+        missing = [c for c in features if cached is None or c not in cached.columns]
+        if missing:
+            new = self.calc_all_features(df_test, missing)
+            if cached is not None:
+                new = pd.concat([cached, new.drop(columns=cached.columns, errors='ignore')], axis=1)
+            cached = self._features_cache[cache_key] = new
+        feat_df = cached[features]
         
         # Align with close prices
         valid_mask = ~feat_df.isna().any(axis=1)
@@ -237,62 +333,56 @@ class ModelBacktester:
         if len(feat_valid) < 100:
             return {'error': 'Not enough valid samples'}
         
-        # Scale features
-        X = feat_valid.values
-        if scaler:
+        # Scale features in place on a private float32 copy
+        X = feat_valid.to_numpy(dtype=np.float32, copy=True)
+        if isinstance(scaler, StandardScaler):
+            if scaler.with_mean:
+                X -= scaler.mean_
+            if scaler.with_std:
+                X /= scaler.scale_
+        elif scaler:
             X = scaler.transform(X)
         
-        # Predict
-        y_pred = model.predict(X)
-        y_proba = model.predict_proba(X)
+        # Predict (one probability pass; the predicted class is its argmax)
+        y_proba = self._predict_proba(model, X)
+        y_pred = np.asarray(model.classes_)[np.argmax(y_proba, axis=1)]
         max_proba = np.max(y_proba, axis=1)
         
         # Simulate trading
         spread_pct = 0.05 if 'btc' in symbol.lower() else 0.02  # Spread cost %
         
-        # Track trades
-        trades = []
-        total_profit = 0
-        wins = 0
-        losses = 0
-        
         close_prices = df_valid['close'].values
-        
-        for i in range(len(y_pred) - 4):  # Leave room for exit
-            if max_proba[i] >= threshold and y_pred[i] != 1:  # Not HOLD
-                signal = 'BUY' if y_pred[i] == 2 else 'SELL'
-                entry_price = close_prices[i]
-                
-                # Exit after 3 bars (simple)
-                exit_price = close_prices[i + 3]
-                
-                if signal == 'BUY':
-                    profit_pct = (exit_price / entry_price - 1) * 100 - spread_pct
-                else:
-                    profit_pct = (entry_price / exit_price - 1) * 100 - spread_pct
-                
-                trades.append({
-                    'signal': signal,
-                    'entry': entry_price,
-                    'exit': exit_price,
-                    'profit_pct': profit_pct
-                })
-                
-                total_profit += profit_pct
-                if profit_pct > 0:
-                    wins += 1
-                else:
-                    losses += 1
-        
-        num_trades = len(trades)
-        win_rate = wins / num_trades * 100 if num_trades > 0 else 0
-        avg_profit = total_profit / num_trades if num_trades > 0 else 0
-        
-        # Calculate max drawdown
-        cumulative = np.cumsum([t['profit_pct'] for t in trades]) if trades else [0]
-        peak = np.maximum.accumulate(cumulative)
-        drawdown = peak - cumulative
-        max_dd = np.max(drawdown) if len(drawdown) > 0 else 0
+
+        # Signal bars that are not HOLD and clear the threshold.
+        # The last 4 bars are left out to leave room for the exit.
+        n_bars = max(len(y_pred) - 4, 0)
+        mask = (max_proba[:n_bars] >= threshold) & (y_pred[:n_bars] != 1)
+
+        num_trades = int(mask.sum())
+        if num_trades == 0:
+            # No bar clears the threshold: skip the trade simulation
+            wins = losses = 0
+            total_profit = avg_profit = win_rate = max_dd = 0.0
+        else:
+            signals = y_pred[:n_bars][mask]
+            entry = close_prices[:n_bars][mask]
+            # Exit after 3 bars (simple)
+            exit_ = close_prices[3:3 + n_bars][mask]
+
+            buy_profit = (exit_ / entry - 1) * 100 - spread_pct
+            sell_profit = (entry / exit_ - 1) * 100 - spread_pct
+            profits = np.where(signals == 2, buy_profit, sell_profit)
+
+            wins = int((profits > 0).sum())
+            losses = num_trades - wins
+            total_profit = float(profits.sum())
+            win_rate = wins / num_trades * 100
+            avg_profit = total_profit / num_trades
+
+            # Calculate max drawdown
+            cumulative = np.cumsum(profits)
+            peak = np.maximum.accumulate(cumulative)
+            max_dd = float(np.max(peak - cumulative))
         
         result = {
             'symbol': symbol,
@@ -320,23 +410,66 @@ class ModelBacktester:
         
         return result
     
-    def backtest_all(self):
-        """Backtest all available models"""
+    def _backtest_safe(self, model_path: Path) -> dict:
+        """Backtest a single model, reporting failures as an error result"""
+        try:
+            return self.backtest_model(model_path)
+        except Exception as e:
+            print(f"Error: {e}")
+            return {'model': model_path.name, 'error': str(e)}
+    
+    def _warm_ohlcv_cache(self, symbols: set):
+        """Parse each needed OHLCV file once so workers start from the Parquet mirror"""
+        for symbol in symbols:
+            try:
+                self.load_ohlcv(symbol)
+            except Exception as e:
+                print(f"Warning: could not preload OHLCV for {symbol}: {e}")
+    
+    def _model_symbol(self, model_path: Path) -> str:
+        """Symbol from a model's (unencrypted) metadata"""
+        secured = self.security.load_secured_model(model_path.stem)
+        return secured.metadata.get('symbol', 'BTCUSD') if secured else 'BTCUSD'
+    
+    def backtest_all(self, max_workers: Optional[int] = None):
+        """Backtest all available models, one worker process per core"""
         models_dir = Path.home() / ".nexustrade" / "models"
         model_files = list(models_dir.glob("*.nexmodel"))
         
         print(f"Found {len(model_files)} models")
         
-        results = []
-        for mf in model_files:
-            try:
-                result = self.backtest_model(mf)
-                results.append(result)
-            except Exception as e:
-                print(f"Error: {e}")
-                results.append({'model': mf.name, 'error': str(e)})
-        
-        return results
+        # Group models by symbol so they share cached features
+        symbols = {mf: self._model_symbol(mf) for mf in model_files}
+        model_files.sort(key=lambda mf: symbols[mf])
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(model_files))
+        if workers <= 1:
+            return [self._backtest_safe(mf) for mf in model_files]
+        
+        self._warm_ohlcv_cache(set(symbols.values()))
+        # Contiguous chunks keep each worker on as few symbols as possible
+        chunksize = -(-len(model_files) // workers)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.ohlcv_dir,),
+        ) as executor:
+            return list(executor.map(_backtest_one, model_files, chunksize=chunksize))
+
+
+# Per-process backtester, so a worker reuses its caches across models
+_worker_backtester: Optional[ModelBacktester] = None
+
+
+def _init_worker(ohlcv_dir: Path):
+    global _worker_backtester
+    # The pool already uses every core; keep each worker's kernels single-threaded
+    set_num_threads(1)
+    _worker_backtester = ModelBacktester(ohlcv_dir)
+
+
+def _backtest_one(model_path: Path) -> dict:
+    return _worker_backtester._backtest_safe(model_path)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,17 @@
 """
 Convert existing XGBoost models to NexusTrade encrypted format
+
+Run from the connector directory: python -m ai.convert_models
 """
 
-import sys
 from pathlib import Path
 from datetime import datetime
 import warnings
-warnings.filterwarnings('ignore')
 
 import numpy as np
 import pandas as pd
 import joblib
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
 
 
@@ -33,7 +32,10 @@ def convert_existing_models():
         print(f"📦 {rel_path}")
         
         try:
-            data = joblib.load(mf)
+            # Pickles from older sklearn/xgboost versions warn on load
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                data = joblib.load(mf)
             
             if isinstance(data, dict):
                 # Get accuracy
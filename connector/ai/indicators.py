@@ -0,0 +1,596 @@
+"""
+Technical Indicator Kernels
+Single-pass NumPy/Numba implementations of the indicators used by the
+feature pipelines. Results match the equivalent pandas expressions.
+"""
+
+import numpy as np
+
+from ai._njit import njit, prange
+
+
+def _as_float_array(x) -> np.ndarray:
+    """Contiguous float array; float32 input stays float32, anything else is float64"""
+    x = np.asarray(x)
+    dtype = np.float32 if x.dtype == np.float32 else np.float64
+    return np.ascontiguousarray(x, dtype=dtype)
+
+
+@njit(cache=True)
+def _multi_ewm(x, alphas, adjust, out):
+    """Exponentially weighted means of x for several alphas in one pass"""
+    n = x.shape[0]
+    k_count = alphas.shape[0]
+    for k in range(k_count):
+        alpha = alphas[k]
+        old_wt_factor = 1.0 - alpha
+        new_wt = 1.0 if adjust else alpha
+        weighted = x[0]
+        old_wt = 1.0
+        out[0, k] = weighted
+        for i in range(1, n):
+            cur = x[i]
+            is_obs = cur == cur
+            if weighted == weighted:
+                old_wt *= old_wt_factor
+                if is_obs:
+                    if weighted != cur:
+                        weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                    if adjust:
+                        old_wt += new_wt
+                    else:
+                        old_wt = 1.0
+            elif is_obs:
+                weighted = cur
+            out[i, k] = weighted
+    return out
+
+
+def ewm_mean(x, spans, adjust: bool = True) -> np.ndarray:
+    """
+    Exponentially weighted mean for several spans at once.
+    Equivalent to ``pd.Series(x).ewm(span=s, adjust=adjust).mean()``
+    for every ``s`` in ``spans``. float32 input gives float32 output;
+    the recurrence itself always runs in float64.
+
+    Returns:
+        Array of shape (len(x), len(spans)), one column per span
+    """
+    x = _as_float_array(x)
+    alphas = 2.0 / (np.asarray(spans, dtype=np.float64) + 1.0)
+    out = np.empty((len(x), len(alphas)), dtype=x.dtype)
+    if len(x):
+        _multi_ewm(x, alphas, adjust, out)
+    return out
+
+
+@njit(cache=True)
+def _rolling_mean_std(x, window, mean_out, std_out):
+    """
+    Rolling mean and sample std (ddof=1) in one sweep of O(1) add/remove
+    updates, as pandas does: a compensated running sum for the mean and a
+    compensated Welford update for the squared deviations.
+    Removing a large value cancels most of the running squared deviations
+    and leaves rounding residue, so when they fall below 1e-4 of their
+    peak the current window is re-reduced exactly. That happens only after
+    an outlier leaves, keeping the sweep amortized O(n) on price data.
+    """
+    n = x.shape[0]
+    nobs = 0
+    # Running sum for the mean
+    neg_ct = 0
+    sum_x = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    # Welford state for the variance
+    mean_x = 0.0
+    ssqdm = 0.0
+    comp_var = 0.0
+    ssqdm_peak = 0.0
+    # Runs of identical values are reported exactly, as pandas does
+    prev_value = np.nan
+    num_same = 0
+    for i in range(n):
+        if i >= window:
+            old = x[i - window]
+            if old == old:
+                nobs -= 1
+                y = -old - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if old < 0:
+                    neg_ct -= 1
+                if nobs:
+                    prev_mean = mean_x - comp_var
+                    y = old - comp_var
+                    t = y - mean_x
+                    comp_var = t + mean_x - y
+                    mean_x -= t / nobs
+                    ssqdm -= (old - prev_mean) * (old - mean_x)
+                else:
+                    mean_x = 0.0
+                    ssqdm = 0.0
+        val = x[i]
+        if val == val:
+            if val == prev_value:
+                num_same += 1
+            else:
+                num_same = 1
+                prev_value = val
+            nobs += 1
+            y = val - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if val < 0:
+                neg_ct += 1
+            prev_mean = mean_x - comp_var
+            y = val - comp_var
+            t = y - mean_x
+            comp_var = t + mean_x - y
+            mean_x += t / nobs
+            ssqdm += (val - prev_mean) * (val - mean_x)
+        if ssqdm >= ssqdm_peak:
+            ssqdm_peak = ssqdm
+        elif ssqdm < ssqdm_peak * 1e-4:
+            # Drop the residue: exact two-pass reduction of the current window
+            total = 0.0
+            for j in range(max(i - window + 1, 0), i + 1):
+                if x[j] == x[j]:
+                    total += x[j]
+            mean_x = total / nobs if nobs else 0.0
+            ssqdm = 0.0
+            for j in range(max(i - window + 1, 0), i + 1):
+                if x[j] == x[j]:
+                    d = x[j] - mean_x
+                    ssqdm += d * d
+            comp_var = 0.0
+            ssqdm_peak = ssqdm
+        if nobs < window:
+            mean_out[i] = np.nan
+            std_out[i] = np.nan
+        elif num_same >= nobs:
+            mean_out[i] = prev_value
+            std_out[i] = 0.0 if nobs > 1 else np.nan
+        else:
+            mean = sum_x / nobs
+            if neg_ct == 0 and mean < 0:
+                mean = 0.0
+            elif neg_ct == nobs and mean > 0:
+                mean = 0.0
+            mean_out[i] = mean
+            std_out[i] = np.sqrt(max(ssqdm, 0.0) / (nobs - 1))
+
+
+@njit(cache=True)
+def _multi_rolling_mean(x, windows, out):
+    """
+    Rolling means for several windows sharing one read of x.
+    Uses pandas' compensated running sum with separate add/remove
+    compensation, sign clamping and exact runs of identical values.
+    """
+    n = x.shape[0]
+    k_count = windows.shape[0]
+    nobs = np.zeros(k_count, dtype=np.int64)
+    neg_ct = np.zeros(k_count, dtype=np.int64)
+    sum_x = np.zeros(k_count)
+    comp_add = np.zeros(k_count)
+    comp_remove = np.zeros(k_count)
+    prev_value = np.nan
+    num_same = 0
+    for i in range(n):
+        val = x[i]
+        is_obs = val == val
+        if is_obs:
+            if val == prev_value:
+                num_same += 1
+            else:
+                num_same = 1
+                prev_value = val
+        for k in range(k_count):
+            window = windows[k]
+            if i >= window:
+                old = x[i - window]
+                if old == old:
+                    nobs[k] -= 1
+                    y = -old - comp_remove[k]
+                    t = sum_x[k] + y
+                    comp_remove[k] = t - sum_x[k] - y
+                    sum_x[k] = t
+                    if old < 0:
+                        neg_ct[k] -= 1
+            if is_obs:
+                nobs[k] += 1
+                y = val - comp_add[k]
+                t = sum_x[k] + y
+                comp_add[k] = t - sum_x[k] - y
+                sum_x[k] = t
+                if val < 0:
+                    neg_ct[k] += 1
+            if nobs[k] >= window:
+                if num_same >= nobs[k]:
+                    result = prev_value
+                else:
+                    result = sum_x[k] / nobs[k]
+                    if neg_ct[k] == 0 and result < 0:
+                        result = 0.0
+                    elif neg_ct[k] == nobs[k] and result > 0:
+                        result = 0.0
+                out[i, k] = result
+            else:
+                out[i, k] = np.nan
+
+
+@njit(cache=True)
+def _rolling_extreme(x, window, take_max, out):
+    """Rolling max (or min) using a monotonic deque of indices"""
+    n = x.shape[0]
+    dq = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    nobs = 0
+    for i in range(n):
+        val = x[i]
+        if val == val:
+            nobs += 1
+            if take_max:
+                while tail > head and x[dq[tail - 1]] <= val:
+                    tail -= 1
+            else:
+                while tail > head and x[dq[tail - 1]] >= val:
+                    tail -= 1
+            dq[tail] = i
+            tail += 1
+        if i >= window:
+            if x[i - window] == x[i - window]:
+                nobs -= 1
+            while tail > head and dq[head] <= i - window:
+                head += 1
+        out[i] = x[dq[head]] if nobs >= window else np.nan
+
+
+@njit(cache=True, error_model='numpy')
+def _rsi(close, period, eps, out):
+    """
+    RSI from rolling means of gains and losses in one pass over close.
+    Gains and losses are recomputed from close as they enter and leave the
+    window; the running sums follow _multi_rolling_mean step for step.
+    """
+    n = close.shape[0]
+    val = np.zeros(2)  # incoming gain, loss
+    old = np.zeros(2)  # outgoing gain, loss
+    sum_x = np.zeros(2)
+    comp_add = np.zeros(2)
+    comp_remove = np.zeros(2)
+    prev_value = np.full(2, np.nan)
+    num_same = np.zeros(2, dtype=np.int64)
+    mean = np.zeros(2)
+    nobs = 0
+    for i in range(n):
+        d = close[i] - close[i - 1] if i > 0 else np.nan
+        val[0] = d if d > 0 else 0.0
+        val[1] = -d if d < 0 else 0.0
+        if i >= period:
+            j = i - period
+            d = close[j] - close[j - 1] if j > 0 else np.nan
+            old[0] = d if d > 0 else 0.0
+            old[1] = -d if d < 0 else 0.0
+        else:
+            nobs += 1
+        for s in range(2):
+            cur = val[s]
+            if cur == prev_value[s]:
+                num_same[s] += 1
+            else:
+                num_same[s] = 1
+                prev_value[s] = cur
+            if i >= period:
+                y = -old[s] - comp_remove[s]
+                t = sum_x[s] + y
+                comp_remove[s] = t - sum_x[s] - y
+                sum_x[s] = t
+            y = cur - comp_add[s]
+            t = sum_x[s] + y
+            comp_add[s] = t - sum_x[s] - y
+            sum_x[s] = t
+            if num_same[s] >= nobs:
+                mean[s] = prev_value[s]
+            else:
+                # Gains and losses are never negative
+                mean[s] = max(sum_x[s] / nobs, 0.0)
+        if nobs < period:
+            out[i] = np.nan
+        else:
+            rs = mean[0] / (mean[1] + eps)
+            out[i] = 100 - (100 / (1 + rs))
+
+
+def rolling_mean_std(x, window: int):
+    """
+    Rolling mean and standard deviation in one pass.
+    Equivalent to ``rolling(window).mean()`` and ``rolling(window).std()``.
+
+    Returns:
+        Tuple of (mean, std) arrays
+    """
+    x = _as_float_array(x)
+    mean = np.empty(len(x), dtype=x.dtype)
+    std = np.empty(len(x), dtype=x.dtype)
+    _rolling_mean_std(x, window, mean, std)
+    return mean, std
+
+
+def rolling_means(x, windows) -> np.ndarray:
+    """
+    Rolling means for several window lengths in one pass.
+    Equivalent to ``rolling(w).mean()`` for every ``w`` in ``windows``.
+
+    Returns:
+        Array of shape (len(x), len(windows)), one column per window
+    """
+    x = _as_float_array(x)
+    windows = np.asarray(windows, dtype=np.int64)
+    out = np.empty((len(x), len(windows)), dtype=x.dtype)
+    _multi_rolling_mean(x, windows, out)
+    return out
+
+
+def rolling_mean(x, window: int) -> np.ndarray:
+    """Equivalent to ``rolling(window).mean()``"""
+    return rolling_means(x, [window])[:, 0]
+
+
+def rsi(close, period: int = 14, eps: float = 1e-10) -> np.ndarray:
+    """
+    RSI over simple rolling means of gains and losses, in float64.
+    Equivalent to ``100 - 100 / (1 + gain / (loss + eps))`` with
+    ``gain = delta.where(delta > 0, 0).rolling(period).mean()`` and
+    ``loss = (-delta.where(delta < 0, 0)).rolling(period).mean()``.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    out = np.empty(len(close))
+    _rsi(close, period, eps, out)
+    return out
+
+
+def rolling_max(x, window: int) -> np.ndarray:
+    """Equivalent to ``rolling(window).max()``"""
+    x = _as_float_array(x)
+    out = np.empty(len(x), dtype=x.dtype)
+    _rolling_extreme(x, window, True, out)
+    return out
+
+
+def rolling_min(x, window: int) -> np.ndarray:
+    """Equivalent to ``rolling(window).min()``"""
+    x = _as_float_array(x)
+    out = np.empty(len(x), dtype=x.dtype)
+    _rolling_extreme(x, window, False, out)
+    return out
+
+
+@njit(cache=True)
+def _rolling_quantiles(x, window, lo, hi, frac, out):
+    """
+    Rolling linear-interpolated quantiles over a sorted window buffer.
+    Each step removes the outgoing value and inserts the incoming one by
+    binary search, so all quantiles share one O(window) update per bar.
+    """
+    n = x.shape[0]
+    buf = np.empty(window, dtype=x.dtype)
+    size = 0
+    nan_count = 0
+    for i in range(n):
+        if i >= window:
+            old = x[i - window]
+            if old == old:
+                pos = np.searchsorted(buf[:size], old)
+                for j in range(pos, size - 1):
+                    buf[j] = buf[j + 1]
+                size -= 1
+            else:
+                nan_count -= 1
+        val = x[i]
+        if val == val:
+            pos = np.searchsorted(buf[:size], val)
+            for j in range(size, pos, -1):
+                buf[j] = buf[j - 1]
+            buf[pos] = val
+            size += 1
+        else:
+            nan_count += 1
+        for k in range(lo.shape[0]):
+            if i < window - 1 or nan_count > 0:
+                out[i, k] = np.nan
+            else:
+                out[i, k] = buf[lo[k]] + frac[k] * (buf[hi[k]] - buf[lo[k]])
+
+
+def rolling_quantiles(x, window: int, qs) -> np.ndarray:
+    """
+    Rolling quantiles for several levels in one pass.
+    Equivalent to ``rolling(window).quantile(q)`` (linear interpolation)
+    for every ``q`` in ``qs``.
+
+    Returns:
+        Array of shape (len(x), len(qs)), one column per quantile
+    """
+    x = _as_float_array(x)
+    pos = np.asarray(qs, dtype=np.float64) * (window - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, window - 1)
+    # Interpolate in the input dtype, as pandas does
+    frac = (pos - lo).astype(x.dtype)
+    out = np.empty((len(x), len(lo)), dtype=x.dtype)
+    _rolling_quantiles(x, window, lo, hi, frac, out)
+    return out
+
+
+def rolling_quantile(x, window: int, q: float) -> np.ndarray:
+    """Equivalent to ``rolling(window).quantile(q)`` (linear interpolation)"""
+    return rolling_quantiles(x, window, [q])[:, 0]
+
+
+@njit(cache=True)
+def _rolling_mad(x, window, out):
+    """Rolling mean absolute deviation, two passes over each cache-resident window"""
+    n = x.shape[0]
+    nan_count = 0
+    for i in range(n):
+        if x[i] != x[i]:
+            nan_count += 1
+        if i >= window and x[i - window] != x[i - window]:
+            nan_count -= 1
+        if i < window - 1 or nan_count > 0:
+            out[i] = np.nan
+            continue
+        total = 0.0
+        for j in range(i - window + 1, i + 1):
+            total += x[j]
+        mean = total / window
+        dev = 0.0
+        for j in range(i - window + 1, i + 1):
+            dev += abs(x[j] - mean)
+        out[i] = dev / window
+
+
+def rolling_mad(x, window: int) -> np.ndarray:
+    """Equivalent to ``rolling(window).apply(lambda w: np.abs(w - w.mean()).mean())``"""
+    x = _as_float_array(x)
+    out = np.empty(len(x), dtype=x.dtype)
+    _rolling_mad(x, window, out)
+    return out
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """
+    True range without the intermediate 3-column frame.
+    Equivalent to ``pd.concat([h - l, abs(h - c.shift()), abs(l - c.shift())], axis=1).max(axis=1)``;
+    fmax skips the missing previous close on the first bar like the pandas max does.
+    """
+    high = np.asarray(high)
+    low = np.asarray(low)
+    close = np.asarray(close)
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    # Reuse two buffers instead of a temporary per term
+    tr = high - low
+    gap = np.subtract(high, prev_close)
+    np.fmax(tr, np.abs(gap, out=gap), out=tr)
+    np.subtract(low, prev_close, out=gap)
+    return np.fmax(tr, np.abs(gap, out=gap), out=tr)
+
+
+def shift(x: np.ndarray, k: int = 1) -> np.ndarray:
+    """Equivalent to ``Series.shift(k)``; negative k looks ahead"""
+    x = np.asarray(x)
+    out = np.empty(x.shape, dtype=np.result_type(x.dtype, np.float32))
+    if k >= 0:
+        out[:k] = np.nan
+        if k < len(x):
+            out[k:] = x[:len(x) - k]
+    else:
+        out[k:] = np.nan
+        if -k < len(x):
+            out[:k] = x[-k:]
+    return out
+
+
+def diff(x: np.ndarray, k: int = 1) -> np.ndarray:
+    """Equivalent to ``Series.diff(k)`` for k >= 1"""
+    x = np.asarray(x)
+    return x - shift(x, k)
+
+
+def pct_change(x: np.ndarray, k: int = 1) -> np.ndarray:
+    """Equivalent to ``Series.pct_change(k)`` (no NaN forward-fill) for k >= 1"""
+    x = np.asarray(x)
+    return x / shift(x, k) - 1
+
+
+@njit(cache=True, error_model='numpy')
+def _momentum_stack(x, lags, one, scale, out):
+    """Percent changes of x for several lags in one read of x"""
+    n = x.shape[0]
+    for i in range(n):
+        for k in range(lags.shape[0]):
+            lag = lags[k]
+            if i < lag:
+                out[i, k] = np.nan
+            else:
+                out[i, k] = (x[i] / x[i - lag] - one) * scale
+    return out
+
+
+def momentum_stack(x, lags) -> np.ndarray:
+    """
+    Percent momentum for several lags at once.
+    Column ``k`` equals ``pd.Series(x).pct_change(lags[k]) * 100``;
+    float32 input is computed and returned in float32.
+
+    Returns:
+        Array of shape (len(x), len(lags)), one column per lag
+    """
+    x = _as_float_array(x)
+    lags = np.asarray(lags, dtype=np.int64)
+    out = np.empty((len(x), len(lags)), dtype=x.dtype)
+    if len(x) and len(lags):
+        _momentum_stack(x, lags, x.dtype.type(1), x.dtype.type(100), out)
+    return out
+
+
+@njit(cache=True, parallel=True)
+def _zscore_columns(arr, cols):
+    """Z-score the given columns of arr in place, one column per thread"""
+    n = arr.shape[0]
+    for k in prange(len(cols)):
+        j = cols[k]
+        total = 0.0
+        count = 0
+        for i in range(n):
+            val = arr[i, j]
+            if val == val:
+                total += val
+                count += 1
+        if count < 2:
+            continue
+        mean = total / count
+        sq = 0.0
+        for i in range(n):
+            val = arr[i, j]
+            if val == val:
+                dev = val - mean
+                sq += dev * dev
+        std = np.sqrt(sq / (count - 1))
+        if std > 0:
+            for i in range(n):
+                arr[i, j] = (arr[i, j] - mean) / std
+    return arr
+
+
+def zscore_columns(arr: np.ndarray, columns=None) -> np.ndarray:
+    """
+    Normalize columns of a 2D array in place with their NaN-skipping
+    mean and sample std (ddof=1), accumulated in float64. Columns with
+    zero or undefined std are left unchanged.
+    ``columns`` selects column indices to normalize (default: all), so
+    scattered columns of a feature matrix are handled in one parallel pass.
+    Columns are independent, so a Fortran-ordered array is the fast layout.
+    """
+    cols = np.arange(arr.shape[1]) if columns is None else np.asarray(columns, dtype=np.int64)
+    if arr.size and len(cols):
+        _zscore_columns(arr, cols)
+    return arr
+
+
+def run_length(mask) -> np.ndarray:
+    """
+    Length of the run of True values ending at each position.
+    Equivalent to ``s.groupby((~s).cumsum()).cumcount()`` for a bool Series ``s``.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    idx = np.arange(len(mask))
+    last_reset = np.maximum.accumulate(np.where(mask, 0, idx))
+    return idx - last_reset
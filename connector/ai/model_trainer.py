@@ -12,7 +12,7 @@ import pickle
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import cross_val_score, TimeSeriesSplit
 from sklearn.metrics import accuracy_score, classification_report
 from loguru import logger
 
@@ -23,7 +23,12 @@ try:
 except ImportError:
     MT5_AVAILABLE = False
 
-from security.model_security import ModelSecurity
+from security.model_security import ModelSecurity, worker_security
+from ai._parallel import forest_n_jobs, share_cores, single_thread_blas
+from ai.indicators import (
+    ewm_mean, rolling_mean, rolling_mean_std, rsi, true_range, momentum_stack, shift,
+    zscore_columns,
+)
 
 
 class ModelTrainer:
@@ -47,13 +52,23 @@ class ModelTrainer:
         'min_samples_split': 20,
         'min_samples_leaf': 10,
         'random_state': 42,
-        'n_jobs': -1
+        'bootstrap': True,
+        'oob_score': True,
     }
     
-    def __init__(self, models_dir: Optional[Path] = None):
+    # Default parameters for the histogram gradient boosting alternative
+    HIST_GB_PARAMS = {
+        'max_iter': 200,
+        'max_depth': 8,
+        'learning_rate': 0.05,
+        'max_bins': 255,
+        'random_state': 42,
+    }
+    
+    def __init__(self, models_dir: Optional[Path] = None, security: Optional[ModelSecurity] = None):
         self.models_dir = models_dir or Path.home() / ".nexustrade" / "models"
         self.models_dir.mkdir(parents=True, exist_ok=True)
-        self.security = ModelSecurity(self.models_dir)
+        self.security = security or ModelSecurity(self.models_dir)
     
     def fetch_historical_data(
         self,
@@ -161,57 +176,45 @@ class ModelTrainer:
         
         Returns DataFrame with normalized features.
         """
-        features = pd.DataFrame(index=df.index)
-        
-        close = df['close']
-        high = df['high']
-        low = df['low']
-        
-        # RSI (14)
-        delta = close.diff()
-        gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        features['rsi'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        ema12 = close.ewm(span=12, adjust=False).mean()
-        ema26 = close.ewm(span=26, adjust=False).mean()
-        features['macd'] = ema12 - ema26
-        features['macd_signal'] = features['macd'].ewm(span=9, adjust=False).mean()
-        features['macd_hist'] = features['macd'] - features['macd_signal']
-        
-        # Bollinger Bands
-        sma20 = close.rolling(window=20).mean()
-        std20 = close.rolling(window=20).std()
-        bb_upper = sma20 + (std20 * 2)
-        bb_lower = sma20 - (std20 * 2)
-        features['bb_width'] = (bb_upper - bb_lower) / sma20
-        features['bb_position'] = (close - bb_lower) / (bb_upper - bb_lower)
-        
-        # EMAs
-        ema_9 = close.ewm(span=9, adjust=False).mean()
-        ema_21 = close.ewm(span=21, adjust=False).mean()
-        features['ema_cross'] = (ema_9 - ema_21) / close
-        
-        # ATR (14)
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(window=14).mean()
-        features['atr_percent'] = atr / close * 100
-        
-        # Price changes
-        features['price_change'] = close.pct_change() * 100
-        features['price_change_5'] = close.pct_change(5) * 100
-        
-        # Normalize
-        for col in features.columns:
-            if features[col].std() > 0:
-                features[col] = (features[col] - features[col].mean()) / features[col].std()
-        
-        return features
+        close = df['close'].to_numpy(dtype=np.float64)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        # One column-major buffer; each indicator is written straight into its column
+        out = np.empty((len(df), len(self.FEATURE_COLUMNS)), order='F')
+        f = dict(zip(self.FEATURE_COLUMNS, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI (14), unsmoothed loss as in the live feature path
+            f['rsi'][:] = rsi(close, 14, eps=0.0)
+            
+            # MACD and EMA cross, one pass over close
+            ema12, ema26, ema_9, ema_21 = ewm_mean(close, [12, 26, 9, 21], adjust=False).T
+            f['macd'][:] = ema12 - ema26
+            f['macd_signal'][:] = ewm_mean(f['macd'], [9], adjust=False)[:, 0]
+            f['macd_hist'][:] = f['macd'] - f['macd_signal']
+            
+            # Bollinger Bands
+            sma20, std20 = rolling_mean_std(close, 20)
+            bb_upper = sma20 + (std20 * 2)
+            bb_lower = sma20 - (std20 * 2)
+            f['bb_width'][:] = (bb_upper - bb_lower) / sma20
+            f['bb_position'][:] = (close - bb_lower) / (bb_upper - bb_lower)
+            
+            # EMAs
+            f['ema_cross'][:] = (ema_9 - ema_21) / close
+            
+            # ATR (14)
+            atr = rolling_mean(true_range(high, low, close), 14)
+            f['atr_percent'][:] = atr / close * 100
+            
+            # Price changes, both lags in one pass over close
+            mom = momentum_stack(close, (1, 5))
+            f['price_change'][:] = mom[:, 0]
+            f['price_change_5'][:] = mom[:, 1]
+        
+        # Normalize all columns in one pass
+        zscore_columns(out)
+        return pd.DataFrame(out, columns=self.FEATURE_COLUMNS, index=df.index)
     
     def create_labels(
         self, 
@@ -227,13 +230,13 @@ class ModelTrainer:
             1 = HOLD (price stays flat)
             2 = BUY (price goes up)
         """
-        future_return = df['close'].shift(-future_periods) / df['close'] - 1
-        
-        labels = pd.Series(1, index=df.index)  # Default HOLD
-        labels[future_return > threshold] = 2   # BUY
-        labels[future_return < -threshold] = 0  # SELL
+        close = df['close'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            future_return = shift(close, -future_periods) / close - 1
         
-        return labels
+        # BUY / SELL past the threshold, HOLD otherwise (including the unlabeled tail)
+        labels = np.where(future_return > threshold, 2, np.where(future_return < -threshold, 0, 1))
+        return pd.Series(labels, index=df.index, dtype=np.int8)
     
     def train(
         self,
@@ -242,10 +245,11 @@ class ModelTrainer:
         days: int = 90,
         future_periods: int = 5,
         threshold: float = 0.002,
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        model_cls: type = RandomForestClassifier
     ) -> Tuple[Any, Dict[str, Any]]:
         """
-        Train a Random Forest model for the given symbol.
+        Train a Random Forest (or HistGradientBoosting) model for the given symbol.
         
         Args:
             symbol: Trading symbol
@@ -254,6 +258,7 @@ class ModelTrainer:
             future_periods: Periods to look ahead for labels
             threshold: Price change threshold for buy/sell
             params: Model hyperparameters
+            model_cls: RandomForestClassifier or HistGradientBoostingClassifier
         
         Returns:
             (trained_model, metrics_dict)
@@ -271,31 +276,59 @@ class ModelTrainer:
         # Create labels
         labels = self.create_labels(df, future_periods, threshold)
         
-        # Align and drop NaN
-        data = pd.concat([features, labels.rename('label')], axis=1).dropna()
+        # Keep rows where every feature is defined (labels are never NaN)
+        ok = ~np.isnan(features.to_numpy()).any(axis=1)
+        n_rows = int(ok.sum())
         
-        if len(data) < 100:
-            raise ValueError(f"Insufficient data: {len(data)} rows")
+        if n_rows < 100:
+            raise ValueError(f"Insufficient data: {n_rows} rows")
         
-        X = data[self.FEATURE_COLUMNS].values
-        y = data['label'].values
+        # The tree builder works on float32; hand it that directly to skip its copy
+        X = np.ascontiguousarray(features[self.FEATURE_COLUMNS].to_numpy()[ok], dtype=np.float32)
+        y = labels.to_numpy()[ok]
         
-        # Split data (80/20)
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        # Chronological split (80/20): test on the most recent bars, no shuffling
+        cut = int(len(X) * 0.8)
+        X_train, X_test = X[:cut], X[cut:]
+        y_train, y_test = y[:cut], y[cut:]
         
         # Train model
-        model_params = {**self.DEFAULT_PARAMS, **(params or {})}
-        model = RandomForestClassifier(**model_params)
-        model.fit(X_train, y_train)
+        is_forest = model_cls is RandomForestClassifier
+        if is_forest:
+            model_params = {**self.DEFAULT_PARAMS, **(params or {})}
+            model_params.setdefault('n_jobs', forest_n_jobs(model_params['n_estimators']))
+            if not model_params['bootstrap']:
+                # Out-of-bag scoring needs bootstrap samples
+                model_params['oob_score'] = False
+        else:
+            model_params = {**self.HIST_GB_PARAMS, **(params or {})}
+        model = model_cls(**model_params)
+        with single_thread_blas():
+            model.fit(X_train, y_train)
         
         # Evaluate
         y_pred = model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
         
-        # Cross-validation
-        cv_scores = cross_val_score(model, X, y, cv=5)
+        # Walk-forward CV: each fold trains only on bars before the ones it is scored on
+        if is_forest:
+            # Lighter single-threaded forests, folds in parallel
+            cv_model = model_cls(**{
+                **model_params,
+                'n_estimators': max(model_params['n_estimators'] // 5, 1),
+                'oob_score': False,
+                'n_jobs': 1,
+            })
+            cv_jobs = forest_n_jobs(5)
+        else:
+            # Boosting already uses every core inside each fit
+            cv_model = model_cls(**model_params)
+            cv_jobs = 1
+        with single_thread_blas():
+            cv_scores = cross_val_score(
+                cv_model, X, y, cv=TimeSeriesSplit(n_splits=5), n_jobs=cv_jobs
+            )
+        cv_mean, cv_std = float(cv_scores.mean()), float(cv_scores.std())
         
         # Calculate class distribution
         unique, counts = np.unique(y, return_counts=True)
@@ -303,18 +336,23 @@ class ModelTrainer:
         
         metrics = {
             'accuracy': float(accuracy),
-            'cv_mean': float(cv_scores.mean()),
-            'cv_std': float(cv_scores.std()),
+            'cv_mean': cv_mean,
+            'cv_std': cv_std,
+            # Out-of-bag rows neighbour in-bag bars, so this overstates live accuracy;
+            # kept for reference only, never as the CV score
+            'oob_score': float(model.oob_score_) if hasattr(model, 'oob_score_') else None,
             'train_samples': len(X_train),
             'test_samples': len(X_test),
             'label_distribution': label_dist,
+            'model_type': type(model).__name__,
+            # HistGradientBoosting exposes no impurity-based importances
             'feature_importance': dict(zip(
                 self.FEATURE_COLUMNS,
                 model.feature_importances_.tolist()
-            ))
+            )) if hasattr(model, 'feature_importances_') else {}
         }
         
-        logger.info(f"Model trained: accuracy={accuracy:.2%}, CV={cv_scores.mean():.2%}±{cv_scores.std():.2%}")
+        logger.info(f"Model trained: accuracy={accuracy:.2%}, CV={cv_mean:.2%}±{cv_std:.2%}")
         
         return model, metrics
     
@@ -337,13 +375,14 @@ class ModelTrainer:
             'symbol': symbol,
             'accuracy': metrics.get('accuracy', 0),
             'cv_mean': metrics.get('cv_mean', 0),
+            'model_type': type(model).__name__,
             'trained_at': datetime.now().isoformat(),
             'description': description,
             'feature_columns': self.FEATURE_COLUMNS
         }
         
         # Encrypt and save
-        secured = self.security.encrypt_model(model, model_id, metadata)
+        secured = self.security.encrypt_model(model, model_id, metadata, compress=True)
         path = self.security.save_secured_model(secured)
         
         logger.info(f"Model saved: {model_id} at {path}")
@@ -366,45 +405,43 @@ class ModelTrainer:
         return model_id, metrics
 
 
-def train_demo_models():
-    """Train models for BTC and XAU demo"""
-    trainer = ModelTrainer()
-    
-    results = {}
-    
-    # Train BTCUSD
-    logger.info("=" * 50)
-    logger.info("Training BTCUSD model...")
-    try:
-        model_id, metrics = trainer.train_and_save(
-            symbol="BTCUSD",
-            timeframe="M15",
-            days=90,
-            future_periods=5,
-            threshold=0.003  # 0.3% for BTC
-        )
-        results['BTCUSD'] = {'model_id': model_id, 'metrics': metrics}
-        logger.info(f"BTCUSD model: {model_id}, accuracy: {metrics['accuracy']:.2%}")
-    except Exception as e:
-        logger.exception(f"Failed to train BTCUSD: {e}")
-        results['BTCUSD'] = {'error': str(e)}
-    
-    # Train XAUUSD
+# Demo symbols and their label thresholds
+DEMO_THRESHOLDS = {
+    'BTCUSD': 0.003,  # 0.3% for BTC
+    'XAUUSD': 0.001,  # 0.1% for Gold
+}
+
+
+def _train_demo_symbol(symbol: str, threshold: float) -> Dict[str, Any]:
+    """Train and save one demo model (runs in its own process)"""
     logger.info("=" * 50)
-    logger.info("Training XAUUSD model...")
+    logger.info(f"Training {symbol} model...")
     try:
+        trainer = ModelTrainer(security=worker_security())
         model_id, metrics = trainer.train_and_save(
-            symbol="XAUUSD",
+            symbol=symbol,
             timeframe="M15",
             days=90,
             future_periods=5,
-            threshold=0.001  # 0.1% for Gold
+            threshold=threshold
         )
-        results['XAUUSD'] = {'model_id': model_id, 'metrics': metrics}
-        logger.info(f"XAUUSD model: {model_id}, accuracy: {metrics['accuracy']:.2%}")
+        logger.info(f"{symbol} model: {model_id}, accuracy: {metrics['accuracy']:.2%}")
+        return {'model_id': model_id, 'metrics': metrics}
     except Exception as e:
-        logger.exception(f"Failed to train XAUUSD: {e}")
-        results['XAUUSD'] = {'error': str(e)}
+        logger.exception(f"Failed to train {symbol}: {e}")
+        return {'error': str(e)}
+
+
+def train_demo_models():
+    """Train models for BTC and XAU demo, one process per symbol"""
+    workers = len(DEMO_THRESHOLDS)
+    # Derive the key once here; workers get a copy of it
+    with ModelSecurity().process_pool(workers, initializer=share_cores, initargs=(workers,)) as executor:
+        futures = {
+            symbol: executor.submit(_train_demo_symbol, symbol, threshold)
+            for symbol, threshold in DEMO_THRESHOLDS.items()
+        }
+        results = {symbol: future.result() for symbol, future in futures.items()}
     
     logger.info("=" * 50)
     logger.info("Training complete!")
@@ -0,0 +1,70 @@
+"""
+OHLCV Data Cache
+Mirrors parsed OHLCV CSVs to Parquet next to the source file so later
+runs skip CSV parsing. The mirror is rebuilt whenever the CSV is newer.
+"""
+
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+from loguru import logger
+
+
+def read_csv_fast(path: Path, **kwargs) -> pd.DataFrame:
+    """pd.read_csv with the multithreaded pyarrow parser, or the C parser without pyarrow"""
+    try:
+        return pd.read_csv(path, engine='pyarrow', **kwargs)
+    except ImportError:
+        return pd.read_csv(path, **kwargs)
+
+
+def parse_btc_csv(path: Path) -> pd.DataFrame:
+    """Parse the Binance-style BTC 15m CSV into time-sorted OHLCV"""
+    df = read_csv_fast(path)
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+    df = df.rename(columns={'open_time': 'time'})
+    if not pd.api.types.is_datetime64_any_dtype(df['time']):
+        # pyarrow already parses clean ISO timestamps itself
+        df['time'] = pd.to_datetime(df['time'].str.strip(), format='ISO8601')
+    return df.sort_values('time').reset_index(drop=True)
+
+
+def parse_xau_csv(path: Path) -> pd.DataFrame:
+    """Parse the semicolon-separated XAUUSD 15m CSV into time-sorted OHLCV"""
+    df = read_csv_fast(path, sep=';')
+    df.columns = [c.strip().lower() for c in df.columns]
+    df = df.rename(columns={'date': 'time'})
+    df['time'] = pd.to_datetime(df['time'])
+    return df.sort_values('time').reset_index(drop=True)
+
+
+def parquet_mirror_path(csv_path: Path) -> Path:
+    """Path of the Parquet mirror for a CSV file"""
+    return csv_path.with_suffix('.parquet')
+
+
+def load_csv_cached(csv_path: Path, parse: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Load a parsed OHLCV CSV, preferring an up-to-date Parquet mirror.
+
+    Args:
+        csv_path: Source CSV file
+        parse: Reads and cleans the CSV into its final DataFrame
+
+    Returns:
+        Parsed DataFrame
+    """
+    parquet_path = parquet_mirror_path(csv_path)
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        try:
+            return pd.read_parquet(parquet_path, memory_map=True)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable parquet cache {parquet_path}: {e}")
+
+    df = parse(csv_path)
+    try:
+        df.to_parquet(parquet_path, index=False, compression='zstd')
+    except Exception as e:
+        logger.warning(f"Could not write parquet cache {parquet_path}: {e}")
+    return df
@@ -5,6 +5,7 @@ Target: ~55-60% win rate with enough signals for trading
 
 import sys
 from pathlib import Path
+from typing import Optional
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
@@ -12,12 +13,18 @@ warnings.filterwarnings('ignore')
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from security.model_security import ModelSecurity
+from security.model_security import ModelSecurity, worker_security
+from ai._parallel import forest_n_jobs, share_cores, single_thread_blas
+from ai._split import chrono_split_scale
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv, parse_xau_csv
+from ai.indicators import (
+    ewm_mean, rolling_mean, rolling_mean_std, rsi, true_range, momentum_stack, shift,
+    zscore_columns,
+)
 
 
 class BalancedTrainer:
@@ -32,18 +39,14 @@ class BalancedTrainer:
         'momentum_short', 'momentum_long', 'atr_pct'
     ]
     
-    def __init__(self, ohlcv_dir: Path = None):
+    def __init__(self, ohlcv_dir: Path = None, security: Optional[ModelSecurity] = None):
         self.ohlcv_dir = ohlcv_dir or Path(__file__).parent.parent.parent / "ohlcv"
-        self.security = ModelSecurity()
+        self.security = security or ModelSecurity()
     
     def load_btc(self) -> pd.DataFrame:
         path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
         print(f"Loading BTC...")
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df = df.rename(columns={'open_time': 'time'})
-        df['time'] = pd.to_datetime(df['time'].str.strip())
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_btc_csv)
         # Use 1.5 years
         cutoff = df['time'].max() - pd.Timedelta(days=540)
         df = df[df['time'] >= cutoff].reset_index(drop=True)
@@ -53,11 +56,7 @@ class BalancedTrainer:
     def load_xau(self) -> pd.DataFrame:
         path = self.ohlcv_dir / "xauusd" / "XAU_15m_data.csv"
         print(f"Loading XAUUSD...")
-        df = pd.read_csv(path, sep=';')
-        df.columns = [c.strip().lower() for c in df.columns]
-        df = df.rename(columns={'date': 'time'})
-        df['time'] = pd.to_datetime(df['time'])
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_xau_csv)
         cutoff = df['time'].max() - pd.Timedelta(days=540)
         df = df[df['time'] >= cutoff].reset_index(drop=True)
         print(f"  XAUUSD: {len(df)} rows")
@@ -65,62 +64,56 @@ class BalancedTrainer:
     
     def calc_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Focused features for trend-following"""
-        f = pd.DataFrame(index=df.index)
-        c = df['close'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        
-        # RSI
-        delta = c.diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        f['rsi'] = 100 - (100 / (1 + rs))
-        f['rsi_ma'] = f['rsi'].rolling(5).mean()
-        
-        # MACD
-        ema12 = c.ewm(span=12).mean()
-        ema26 = c.ewm(span=26).mean()
-        macd = ema12 - ema26
-        macd_sig = macd.ewm(span=9).mean()
-        f['macd_hist'] = macd - macd_sig
-        f['macd_cross'] = (macd > macd_sig).astype(float) - 0.5
-        
-        # BB Position
-        sma20 = c.rolling(20).mean()
-        std20 = c.rolling(20).std()
-        bb_up = sma20 + 2 * std20
-        bb_lo = sma20 - 2 * std20
-        f['bb_pos'] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
-        
-        # Trend (EMA alignment)
-        ema9 = c.ewm(span=9).mean()
-        ema21 = c.ewm(span=21).mean()
-        f['trend_ema'] = (ema9 - ema21) / c * 100
-        
-        # Trend strength (simple)
-        f['trend_strength'] = abs(f['trend_ema'])
-        
-        # Momentum
-        f['momentum_short'] = c.pct_change(4) * 100  # 1 hour
-        f['momentum_long'] = c.pct_change(16) * 100  # 4 hours
-        
-        # ATR %
-        tr = pd.concat([h - l, abs(h - c.shift()), abs(l - c.shift())], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean()
-        f['atr_pct'] = atr / c * 100
+        c = df['close'].to_numpy(dtype=np.float64)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        # One column-major buffer; each indicator is written straight into its column
+        out = np.empty((len(df), len(self.FEATURES)), order='F')
+        f = dict(zip(self.FEATURES, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI
+            f['rsi'][:] = rsi(c, 14)
+            f['rsi_ma'][:] = rolling_mean(f['rsi'], 5)
+            
+            # MACD and trend EMAs, one pass over close
+            ema12, ema26, ema9, ema21 = ewm_mean(c, [12, 26, 9, 21]).T
+            macd = ema12 - ema26
+            macd_sig = ewm_mean(macd, [9])[:, 0]
+            f['macd_hist'][:] = macd - macd_sig
+            f['macd_cross'][:] = (macd > macd_sig).astype(float) - 0.5
+            
+            # BB Position
+            sma20, std20 = rolling_mean_std(c, 20)
+            bb_up = sma20 + 2 * std20
+            bb_lo = sma20 - 2 * std20
+            f['bb_pos'][:] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
+            
+            # Trend (EMA alignment)
+            f['trend_ema'][:] = (ema9 - ema21) / c * 100
+            
+            # Trend strength (simple)
+            f['trend_strength'][:] = abs(f['trend_ema'])
+            
+            # Momentum, both lags in one pass over close
+            mom = momentum_stack(c, (4, 16))
+            f['momentum_short'][:] = mom[:, 0]  # 1 hour
+            f['momentum_long'][:] = mom[:, 1]  # 4 hours
+            
+            # ATR %
+            atr = rolling_mean(true_range(h, l, c), 14)
+            f['atr_pct'][:] = atr / c * 100
         
-        # Normalize only the non-binary features
-        for col in ['rsi', 'rsi_ma', 'macd_hist', 'bb_pos', 'trend_ema', 
-                    'trend_strength', 'momentum_short', 'momentum_long', 'atr_pct']:
-            if f[col].std() > 0:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
+        # Normalize only the non-binary features: every column but macd_cross
+        binary = self.FEATURES.index('macd_cross')
+        zscore_columns(out[:, :binary])
+        zscore_columns(out[:, binary + 1:])
         
-        return f
+        return pd.DataFrame(out, columns=self.FEATURES, index=df.index)
     
     def create_labels(self, df: pd.DataFrame, symbol: str) -> pd.Series:
         """Create labels with moderate threshold"""
-        c = df['close'].astype(float)
+        c = df['close'].to_numpy(dtype=np.float64)
         
         # Look 6 bars ahead (1.5 hours)
         look_ahead = 6
@@ -131,13 +124,12 @@ class BalancedTrainer:
         else:
             threshold = 0.15  # 0.15% for Gold
         
-        future_ret = (c.shift(-look_ahead) / c - 1) * 100
-        
-        labels = pd.Series(1, index=df.index)  # HOLD
-        labels[future_ret > threshold] = 2  # BUY
-        labels[future_ret < -threshold] = 0  # SELL
+        with np.errstate(divide='ignore', invalid='ignore'):
+            future_ret = (shift(c, -look_ahead) / c - 1) * 100
         
-        return labels
+        # BUY above, SELL below, HOLD in between and for the unlabeled tail
+        labels = np.where(future_ret > threshold, 2, np.where(future_ret < -threshold, 0, 1))
+        return pd.Series(labels, index=df.index, dtype=np.int8)
     
     def train(self, symbol: str, df: pd.DataFrame) -> dict:
         print(f"\n{'='*60}")
@@ -147,23 +139,17 @@ class BalancedTrainer:
         features = self.calc_features(df)
         labels = self.create_labels(df, symbol)
         
-        data = pd.concat([features, labels.rename('label')], axis=1)
-        data = data.replace([np.inf, -np.inf], np.nan).dropna()
-        
-        print(f"Samples: {len(data)}")
-        lc = data['label'].value_counts().sort_index()
-        print(f"  SELL: {lc.get(0,0)} | HOLD: {lc.get(1,0)} | BUY: {lc.get(2,0)}")
-        
-        X = data[self.FEATURES].values
-        y = data['label'].values
+        # Keep rows where every feature is finite (labels are never NaN)
+        ok = np.isfinite(features.to_numpy()).all(axis=1)
+        X = features[self.FEATURES].to_numpy()[ok]
+        y = labels.to_numpy()[ok]
         
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
+        print(f"Samples: {len(y)}")
+        lc = np.bincount(y, minlength=3)
+        print(f"  SELL: {lc[0]} | HOLD: {lc[1]} | BUY: {lc[2]}")
         
         scaler = StandardScaler()
-        X_train = scaler.fit_transform(X_train)
-        X_test = scaler.transform(X_test)
+        X_train, X_test, y_train, y_test = chrono_split_scale(X, y, scaler)
         
         print("Training Random Forest...")
         model = RandomForestClassifier(
@@ -173,28 +159,34 @@ class BalancedTrainer:
             min_samples_leaf=15,
             class_weight='balanced',
             random_state=42,
-            n_jobs=-1
+            n_jobs=forest_n_jobs(150)
         )
-        model.fit(X_train, y_train)
+        with single_thread_blas():
+            model.fit(X_train, y_train)
         
         # Evaluate at multiple thresholds
         y_proba = model.predict_proba(X_test)
-        y_pred_all = model.predict(X_test)
+        # Same as model.predict, without a second pass through the forest
+        y_pred_all = model.classes_[np.argmax(y_proba, axis=1)]
+        max_p = y_proba.max(axis=1)
+        hit = y_pred_all == y_test
+        non_hold = y_pred_all != 1  # Exclude HOLD
         
         print("\nWin Rate Analysis:")
+        # Trades at every threshold at once, one column per threshold
+        thresholds = np.array([0.40, 0.45, 0.50, 0.55, 0.60])
+        trades_at = non_hold[:, None] & (max_p[:, None] >= thresholds)
+        n_trades = trades_at.sum(axis=0)
+        n_correct = (trades_at & hit[:, None]).sum(axis=0)
+        
         results = {}
-        for thresh in [0.40, 0.45, 0.50, 0.55, 0.60]:
-            max_p = np.max(y_proba, axis=1)
-            conf = max_p >= thresh
-            trades = (y_pred_all != 1) & conf  # Exclude HOLD
-            
-            if trades.sum() > 0:
-                correct = (y_test[trades] == y_pred_all[trades]).sum()
-                wr = correct / trades.sum() * 100
-                results[thresh] = {'win_rate': wr, 'trades': trades.sum()}
+        for thresh, n, correct in zip(thresholds.tolist(), n_trades, n_correct):
+            if n > 0:
+                wr = correct / n * 100
+                results[thresh] = {'win_rate': wr, 'trades': n}
                 
-                pct = trades.sum() / len(y_test) * 100
-                print(f"  Threshold {thresh:.0%}: Win Rate {wr:.1f}%, Trades {trades.sum()} ({pct:.1f}%)")
+                pct = n / len(y_test) * 100
+                print(f"  Threshold {thresh:.0%}: Win Rate {wr:.1f}%, Trades {n} ({pct:.1f}%)")
         
         # Use threshold that gives ~55% win rate with enough trades
         best_thresh = 0.50
@@ -204,16 +196,15 @@ class BalancedTrainer:
                 break
         
         # Final metrics at chosen threshold
-        max_p = np.max(y_proba, axis=1)
         conf = max_p >= best_thresh
-        trades = (y_pred_all != 1) & conf
+        trades = non_hold & conf
         
         win_rate = 0
         buy_prec = 0
         sell_prec = 0
         
         if trades.sum() > 0:
-            correct = (y_test[trades] == y_pred_all[trades]).sum()
+            correct = hit[trades].sum()
             win_rate = correct / trades.sum() * 100
             
             # Buy precision
@@ -272,32 +263,30 @@ class BalancedTrainer:
         print(f"\n✅ Saved: {model_id}")
         return model_id
     
-    def run(self):
-        results = {}
-        
-        # BTC
-        try:
-            df = self.load_btc()
-            res = self.train("BTCUSD", df)
-            mid = self.save(res, "BTCUSD")
-            results['BTCUSD'] = {'model_id': mid, **res['metrics']}
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            results['BTCUSD'] = {'error': str(e)}
-        
-        # XAUUSD
+    def run_symbol(self, symbol: str) -> dict:
+        """Load, train and save the model for one symbol"""
         try:
-            df = self.load_xau()
-            res = self.train("XAUUSD", df)
-            mid = self.save(res, "XAUUSD")
-            results['XAUUSD'] = {'model_id': mid, **res['metrics']}
+            df = self.load_btc() if symbol == "BTCUSD" else self.load_xau()
+            res = self.train(symbol, df)
+            mid = self.save(res, symbol)
+            return {'model_id': mid, **res['metrics']}
         except Exception as e:
             import traceback
             traceback.print_exc()
-            results['XAUUSD'] = {'error': str(e)}
-        
-        return results
+            return {'error': str(e)}
+    
+    def run(self):
+        """Train BTCUSD and XAUUSD side by side, one process per symbol"""
+        symbols = ["BTCUSD", "XAUUSD"]
+        # Derive the key once here; workers get a copy of it
+        with self.security.process_pool(len(symbols), initializer=share_cores,
+                                        initargs=(len(symbols),)) as executor:
+            futures = {s: executor.submit(_run_symbol, self.ohlcv_dir, s) for s in symbols}
+            return {s: f.result() for s, f in futures.items()}
+
+
+def _run_symbol(ohlcv_dir: Path, symbol: str) -> dict:
+    return BalancedTrainer(ohlcv_dir, worker_security()).run_symbol(symbol)
 
 
 if __name__ == "__main__":
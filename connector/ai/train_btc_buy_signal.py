@@ -13,12 +13,16 @@ warnings.filterwarnings('ignore')
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score
 from sklearn.preprocessing import StandardScaler
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
+from ai._btc_features import base_indicators
+from ai._split import chrono_split_scale
+from ai._xgb import device_params, fit_early_stopped
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv
+from ai.indicators import momentum_stack, diff, shift, zscore_columns
 
 
 class BinaryBuyClassifier:
@@ -46,11 +50,7 @@ class BinaryBuyClassifier:
         path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
         print(f"Loading BTC from {path}")
         
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df = df.rename(columns={'open_time': 'time'})
-        df['time'] = pd.to_datetime(df['time'].str.strip())
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_btc_csv)
         
         cutoff = df['time'].max() - pd.Timedelta(days=730)
         df = df[df['time'] >= cutoff].reset_index(drop=True)
@@ -60,71 +60,60 @@ class BinaryBuyClassifier:
     
     def calc_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Features focused on BUY setups"""
-        f = pd.DataFrame(index=df.index)
-        
-        c = df['close'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        v = df['volume'].astype(float)
-        
-        # Trend (EMA based)
-        ema20 = c.ewm(span=20).mean()
-        ema50 = c.ewm(span=50).mean()
-        ema200 = c.ewm(span=200).mean()
-        
-        f['trend_bullish'] = ((c > ema20) & (ema20 > ema50)).astype(float)
-        f['ema_stack'] = ((ema20 > ema50) & (ema50 > ema200)).astype(float)
-        
-        # Trend strength
-        f['trend_strength'] = abs(c - ema50) / ema50 * 100
-        
-        # Momentum
-        mom = c.pct_change(8) * 100
-        f['momentum_positive'] = (mom > 0).astype(float)
-        f['momentum_accel'] = mom.diff(4)
-        
-        # RSI setup (not overbought, rising from low)
-        delta = c.diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-        # Good buy: RSI between 30-60 and rising
-        f['rsi_setup'] = ((rsi > 30) & (rsi < 60) & (rsi > rsi.shift(3))).astype(float)
-        
-        # MACD
-        ema12 = c.ewm(span=12).mean()
-        ema26 = c.ewm(span=26).mean()
-        macd = ema12 - ema26
-        macd_sig = macd.ewm(span=9).mean()
-        f['macd_bullish'] = (macd > macd_sig).astype(float)
-        f['macd_momentum'] = macd - macd_sig
-        
-        # Bollinger Bands
-        sma20 = c.rolling(20).mean()
-        std20 = c.rolling(20).std()
-        bb_lo = sma20 - 2 * std20
-        bb_up = sma20 + 2 * std20
-        f['bb_position'] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
-        
-        # Price near support (lower BB or recent low)
-        low_10 = l.rolling(10).min()
-        f['price_near_support'] = (c < low_10 * 1.01).astype(float)
-        
-        # Breakout
-        high_20 = h.rolling(20).max()
-        f['breakout_up'] = (c > high_20.shift(1)).astype(float)
-        
-        # Volume confirms
-        vol_ma = v.rolling(20).mean()
-        f['volume_confirms'] = (v > vol_ma).astype(float)
+        c = df['close'].to_numpy(dtype=np.float64)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        v = df['volume'].to_numpy(dtype=np.float64)
+        base = base_indicators(c, h, l, v)
+        # One column-major buffer; each feature is written straight into its column
+        out = np.empty((len(df), len(self.FEATURES)), order='F')
+        f = dict(zip(self.FEATURES, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Trend (EMA based)
+            ema20, ema50, ema200 = base['ema20'], base['ema50'], base['ema200']
+            f['trend_bullish'][:] = (c > ema20) & (ema20 > ema50)
+            f['ema_stack'][:] = (ema20 > ema50) & (ema50 > ema200)
+            
+            # Trend strength
+            trend_strength = np.subtract(c, ema50, out=f['trend_strength'])
+            np.abs(trend_strength, out=trend_strength)
+            trend_strength /= ema50
+            trend_strength *= 100
+            
+            # Momentum
+            mom = momentum_stack(c, (8,))[:, 0]
+            f['momentum_positive'][:] = mom > 0
+            f['momentum_accel'][:] = diff(mom, 4)
+            
+            # RSI setup (not overbought, rising from low)
+            rsi = base['rsi14']
+            # Good buy: RSI between 30-60 and rising
+            f['rsi_setup'][:] = (rsi > 30) & (rsi < 60) & (rsi > shift(rsi, 3))
+            
+            # MACD
+            macd, macd_sig = base['macd'], base['macd_sig']
+            f['macd_bullish'][:] = macd > macd_sig
+            f['macd_momentum'][:] = macd - macd_sig
+            
+            # Bollinger Bands
+            bb_lo = base['sma20'] - 2 * base['std20']
+            bb_up = base['sma20'] + 2 * base['std20']
+            f['bb_position'][:] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
+            
+            # Price near support (lower BB or recent low)
+            f['price_near_support'][:] = c < base['low10'] * 1.01
+            
+            # Breakout
+            f['breakout_up'][:] = c > shift(base['high20'], 1)
+            
+            # Volume confirms
+            f['volume_confirms'][:] = v > base['vol_ma20']
         
         # Normalize
-        for col in ['trend_strength', 'momentum_accel', 'macd_momentum', 'bb_position']:
-            if f[col].std() > 0:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
+        zscore_columns(out, [self.FEATURES.index(col) for col in ['trend_strength', 'momentum_accel', 'macd_momentum', 'bb_position']])
         
-        return f
+        return pd.DataFrame(out, columns=self.FEATURES, index=df.index)
     
     def create_labels(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -132,17 +121,16 @@ class BinaryBuyClassifier:
         1 = Price goes up at least 0.5% in next 12 bars (3 hours)
         0 = Not a good buy
         """
-        c = df['close'].astype(float)
+        c = df['close'].to_numpy(dtype=np.float64)
         
         look_ahead = 12
-        future_ret = (c.shift(-look_ahead) / c - 1) * 100
+        with np.errstate(divide='ignore', invalid='ignore'):
+            future_ret = (shift(c, -look_ahead) / c - 1) * 100
         
-        # 0.5% target for BTC
+        # 0.5% target for BTC; the unlabeled tail counts as no buy
         threshold = 0.5
         
-        labels = (future_ret > threshold).astype(int)
-        
-        return labels
+        return pd.Series(future_ret > threshold, index=df.index, dtype=np.int8)
     
     def train(self) -> dict:
         print(f"\n{'='*60}")
@@ -154,22 +142,16 @@ class BinaryBuyClassifier:
         features = self.calc_features(df)
         labels = self.create_labels(df)
         
-        data = pd.concat([features, labels.rename('label')], axis=1)
-        data = data.replace([np.inf, -np.inf], np.nan).dropna()
+        # Keep rows where every feature is finite (labels are never NaN)
+        ok = np.isfinite(features.to_numpy()).all(axis=1)
+        X = features[self.FEATURES].to_numpy()[ok]
+        y = labels.to_numpy()[ok]
         
-        print(f"\nSamples: {len(data)}")
-        lc = data['label'].value_counts()
-        print(f"Labels: NO_BUY={lc.get(0,0)} ({lc.get(0,0)/len(data)*100:.1f}%) | BUY={lc.get(1,0)} ({lc.get(1,0)/len(data)*100:.1f}%)")
+        print(f"\nSamples: {len(y)}")
+        lc = np.bincount(y, minlength=2)
+        print(f"Labels: NO_BUY={lc[0]} ({lc[0]/len(y)*100:.1f}%) | BUY={lc[1]} ({lc[1]/len(y)*100:.1f}%)")
         
-        X = data[self.FEATURES].values
-        y = data['label'].values
-        
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
-        
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled, X_test_scaled, y_train, y_test = chrono_split_scale(X, y, self.scaler)
         
         # Handle imbalance with class weight
         pos_count = (y_train == 1).sum()
@@ -177,11 +159,9 @@ class BinaryBuyClassifier:
         scale_weight = neg_count / pos_count if pos_count > 0 else 1
         print(f"\n📊 Class weight: {scale_weight:.2f}")
         
-        X_train_balanced, y_train_balanced = X_train_scaled, y_train
-        
         print("\n📊 Training XGBoost...")
         model = xgb.XGBClassifier(
-            n_estimators=200,
+            n_estimators=400,  # Ceiling; early stopping picks the round count
             max_depth=6,
             learning_rate=0.03,
             scale_pos_weight=2,  # Weight positive class more
@@ -189,33 +169,45 @@ class BinaryBuyClassifier:
             subsample=0.8,
             colsample_bytree=0.8,
             random_state=42,
-            eval_metric='logloss'
+            eval_metric='logloss',
+            early_stopping_rounds=20,
+            **device_params()
         )
-        model.fit(X_train_balanced, y_train_balanced)
+        fit_early_stopped(model, X_train_scaled, y_train)
+        print(f"   Stopped at {model.best_iteration + 1} trees")
         
-        y_pred = model.predict(X_test_scaled)
         y_proba = model.predict_proba(X_test_scaled)[:, 1]
+        # Same as model.predict, without a second pass through the trees
+        y_pred = (y_proba > 0.5).astype(np.int8)
         
         print("\n📈 Win Rate (Precision) Analysis:")
         print("(How many BUY signals actually profit?)\n")
         
+        # Signals and hits at every threshold at once, one column per threshold
+        is_buy = y_test == 1
+        total_profitable = is_buy.sum()
+        thresholds = np.array([0.40, 0.45, 0.50, 0.55, 0.60, 0.65, 0.70, 0.75, 0.80, 0.85, 0.90])
+        signals_at = y_proba[:, None] >= thresholds
+        n_signals = signals_at.sum(axis=0)
+        n_true_pos = (signals_at & is_buy[:, None]).sum(axis=0)
+        sweep = dict(zip(thresholds.tolist(), zip(n_signals, n_true_pos)))
+        
         best = {'threshold': 0.5, 'precision': 0, 'trades': 0, 'recall': 0}
+        # Report lines are written in one go after the sweep
+        rows = []
         
         for thresh in [0.40, 0.45, 0.50, 0.55, 0.60, 0.65, 0.70, 0.75]:
-            buy_signals = y_proba >= thresh
+            total_signals, true_pos = sweep[thresh]
             
-            if buy_signals.sum() > 5:
+            if total_signals > 5:
                 # Precision = Win Rate for BUY signals
-                true_pos = (y_test[buy_signals] == 1).sum()
-                total_signals = buy_signals.sum()
                 precision = true_pos / total_signals * 100
                 
                 # Recall = What % of profitable moves did we catch?
-                total_profitable = (y_test == 1).sum()
                 recall = true_pos / total_profitable * 100 if total_profitable > 0 else 0
                 
                 marker = "✅" if precision >= 50 else "⚠️"
-                print(f"  {marker} Threshold {thresh:.0%}: Win Rate {precision:.1f}%, Signals {total_signals} (catch {recall:.1f}% of moves)")
+                rows.append(f"  {marker} Threshold {thresh:.0%}: Win Rate {precision:.1f}%, Signals {total_signals} (catch {recall:.1f}% of moves)")
                 
                 if precision > best['precision'] and total_signals >= 10:
                     best = {'threshold': thresh, 'precision': precision, 'trades': int(total_signals), 'recall': recall}
@@ -223,16 +215,18 @@ class BinaryBuyClassifier:
         if best['precision'] < 50:
             # Try higher thresholds
             for thresh in [0.80, 0.85, 0.90]:
-                buy_signals = y_proba >= thresh
-                if buy_signals.sum() > 0:
-                    true_pos = (y_test[buy_signals] == 1).sum()
-                    precision = true_pos / buy_signals.sum() * 100
+                total_signals, true_pos = sweep[thresh]
+                if total_signals > 0:
+                    precision = true_pos / total_signals * 100
                     if precision >= 50:
-                        recall = true_pos / (y_test == 1).sum() * 100
-                        best = {'threshold': thresh, 'precision': precision, 'trades': int(buy_signals.sum()), 'recall': recall}
-                        print(f"  ✅ Threshold {thresh:.0%}: Win Rate {precision:.1f}%, Signals {buy_signals.sum()}")
+                        recall = true_pos / total_profitable * 100
+                        best = {'threshold': thresh, 'precision': precision, 'trades': int(total_signals), 'recall': recall}
+                        rows.append(f"  ✅ Threshold {thresh:.0%}: Win Rate {precision:.1f}%, Signals {total_signals}")
                         break
         
+        if rows:
+            print("\n".join(rows))
+        
         acc = accuracy_score(y_test, y_pred)
         
         print(f"\n{'='*60}")
@@ -13,13 +13,20 @@ warnings.filterwarnings('ignore')
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier, VotingClassifier
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
+from ai._btc_features import base_indicators
+from ai._parallel import physical_cores
+from ai._split import chrono_split_scale
+from ai._xgb import XGB_DEVICE, device_params, to_cpu
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv
+from ai.indicators import (
+    rolling_mean, rolling_quantiles, momentum_stack, diff, pct_change, shift, zscore_columns,
+)
 
 
 class HighWinRateBTCTrainer:
@@ -58,11 +65,7 @@ class HighWinRateBTCTrainer:
         path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
         print(f"Loading BTC from {path}")
         
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df = df.rename(columns={'open_time': 'time'})
-        df['time'] = pd.to_datetime(df['time'].str.strip())
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_btc_csv)
         
         # Use 2 years
         cutoff = df['time'].max() - pd.Timedelta(days=730)
@@ -73,109 +76,105 @@ class HighWinRateBTCTrainer:
     
     def calc_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Calculate trend-focused features"""
-        f = pd.DataFrame(index=df.index)
-        
-        c = df['close'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        v = df['volume'].astype(float)
-        
-        # === TREND FEATURES ===
-        ema9 = c.ewm(span=9).mean()
-        ema21 = c.ewm(span=21).mean()
-        ema50 = c.ewm(span=50).mean()
-        ema200 = c.ewm(span=200).mean()
-        
-        # EMA alignment (strong trend signal)
-        bull_align = (ema9 > ema21) & (ema21 > ema50) & (ema50 > ema200)
-        bear_align = (ema9 < ema21) & (ema21 < ema50) & (ema50 < ema200)
-        f['trend_ema_align'] = bull_align.astype(float) - bear_align.astype(float)
-        
-        # MACD trend
-        ema12 = c.ewm(span=12).mean()
-        ema26 = c.ewm(span=26).mean()
-        macd = ema12 - ema26
-        macd_sig = macd.ewm(span=9).mean()
-        f['trend_macd'] = np.sign(macd)
-        f['macd_hist'] = (macd - macd_sig) / c * 100
-        f['macd_direction'] = np.sign(f['macd_hist'].diff(3))
-        
-        # Momentum trend (consistent direction)
-        mom_4 = c.pct_change(4)
-        mom_16 = c.pct_change(16)
-        mom_48 = c.pct_change(48)
-        f['trend_momentum'] = (np.sign(mom_4) == np.sign(mom_16)).astype(float)
-        f['trend_consistency'] = ((np.sign(mom_4) == np.sign(mom_16)) & 
-                                  (np.sign(mom_16) == np.sign(mom_48))).astype(float)
-        
-        # ADX-like trend strength
-        plus_dm = ((h - h.shift()).where((h - h.shift()) > (l.shift() - l), 0)).rolling(14).mean()
-        minus_dm = ((l.shift() - l).where((l.shift() - l) > (h - h.shift()), 0)).rolling(14).mean()
-        dx = abs(plus_dm - minus_dm) / (plus_dm + minus_dm + 1e-10)
-        adx = dx.rolling(14).mean()
-        f['trend_strength'] = (adx > 0.25).astype(float)  # Strong trend
-        
-        # === RSI SIGNALS ===
-        delta = c.diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-        # RSI in favorable zone (not extreme)
-        f['rsi_signal'] = ((rsi > 40) & (rsi < 60)).astype(float)  # Neutral zone
-        f['rsi_momentum'] = rsi.diff(3)
-        
-        # === VOLATILITY FILTER ===
-        tr = pd.concat([h - l, abs(h - c.shift()), abs(l - c.shift())], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean()
-        atr_pct = atr / c * 100
-        
-        # Normal volatility (not too high, not too low)
-        atr_q25 = atr_pct.rolling(100).quantile(0.25)
-        atr_q75 = atr_pct.rolling(100).quantile(0.75)
-        f['volatility_ok'] = ((atr_pct > atr_q25) & (atr_pct < atr_q75)).astype(float)
-        f['atr_normal'] = atr_pct
-        
-        # === VOLUME CONFIRMATION ===
-        vol_ma = v.rolling(20).mean()
-        vol_ratio = v / (vol_ma + 1e-10)
-        f['volume_confirms'] = (vol_ratio > 1.2).astype(float)  # Above average volume
-        f['volume_trend'] = vol_ma.pct_change(10)
-        
-        # === PRICE ACTION ===
-        high_20 = h.rolling(20).max()
-        low_20 = l.rolling(20).min()
-        f['price_strength'] = (c - low_20) / (high_20 - low_20 + 1e-10)
-        
-        # Breakout detection
-        f['breakout_signal'] = ((c > high_20.shift(1)) | (c < low_20.shift(1))).astype(float)
+        c = df['close'].to_numpy(dtype=np.float64)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        v = df['volume'].to_numpy(dtype=np.float64)
+        base = base_indicators(c, h, l, v)
+        # One column-major buffer; each feature is written straight into its column
+        out = np.empty((len(df), len(self.FEATURES)), order='F')
+        f = dict(zip(self.FEATURES, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # === TREND FEATURES ===
+            ema9, ema21, ema50, ema200 = base['ema9'], base['ema21'], base['ema50'], base['ema200']
+            
+            # EMA alignment (strong trend signal)
+            bull_align = (ema9 > ema21) & (ema21 > ema50) & (ema50 > ema200)
+            bear_align = (ema9 < ema21) & (ema21 < ema50) & (ema50 < ema200)
+            f['trend_ema_align'][:] = bull_align
+            f['trend_ema_align'] -= bear_align
+            
+            # MACD trend; the ufuncs write straight into their feature columns
+            macd, macd_sig = base['macd'], base['macd_sig']
+            np.sign(macd, out=f['trend_macd'])
+            macd_hist = np.subtract(macd, macd_sig, out=f['macd_hist'])
+            macd_hist /= c
+            macd_hist *= 100
+            np.sign(diff(macd_hist, 3), out=f['macd_direction'])
+            
+            # Momentum trend (consistent direction)
+            mom = momentum_stack(c, (4, 16, 48))
+            sign_4, sign_16, sign_48 = np.sign(mom, out=mom).T
+            f['trend_momentum'][:] = sign_4 == sign_16
+            f['trend_consistency'][:] = (sign_4 == sign_16) & (sign_16 == sign_48)
+            
+            # ADX-like trend strength
+            up_move = diff(h)
+            down_move = -diff(l)
+            plus_dm = rolling_mean(np.where(up_move > down_move, up_move, 0.0), 14)
+            minus_dm = rolling_mean(np.where(down_move > up_move, down_move, 0.0), 14)
+            dm_sum = plus_dm + minus_dm
+            dm_sum += 1e-10
+            dx = np.abs(plus_dm - minus_dm, out=plus_dm)
+            dx /= dm_sum
+            adx = rolling_mean(dx, 14)
+            f['trend_strength'][:] = adx > 0.25  # Strong trend
+            
+            # === RSI SIGNALS ===
+            rsi = base['rsi14']
+            # RSI in favorable zone (not extreme)
+            f['rsi_signal'][:] = (rsi > 40) & (rsi < 60)  # Neutral zone
+            f['rsi_momentum'][:] = diff(rsi, 3)
+            
+            # === VOLATILITY FILTER ===
+            atr_pct = np.divide(base['atr14'], c, out=f['atr_normal'])
+            atr_pct *= 100
+            
+            # Normal volatility (not too high, not too low)
+            atr_q25, atr_q75 = rolling_quantiles(atr_pct, 100, [0.25, 0.75]).T
+            f['volatility_ok'][:] = (atr_pct > atr_q25) & (atr_pct < atr_q75)
+            
+            # === VOLUME CONFIRMATION ===
+            vol_ma = base['vol_ma20']
+            vol_ratio = vol_ma + 1e-10
+            np.divide(v, vol_ratio, out=vol_ratio)
+            f['volume_confirms'][:] = vol_ratio > 1.2  # Above average volume
+            f['volume_trend'][:] = pct_change(vol_ma, 10)
+            
+            # === PRICE ACTION ===
+            high_20, low_20 = base['high20'], base['low20']
+            price_range = high_20 - low_20
+            price_range += 1e-10
+            price_strength = np.subtract(c, low_20, out=f['price_strength'])
+            price_strength /= price_range
+            
+            # Breakout detection
+            f['breakout_signal'][:] = (c > shift(high_20, 1)) | (c < shift(low_20, 1))
         
         # Normalize continuous features
-        for col in ['macd_hist', 'rsi_momentum', 'atr_normal', 'volume_trend', 'price_strength']:
-            if col in f.columns and f[col].std() > 0:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
+        zscore_columns(out, [self.FEATURES.index(col) for col in ['macd_hist', 'rsi_momentum', 'atr_normal', 'volume_trend', 'price_strength']])
         
-        return f
+        return pd.DataFrame(out, columns=self.FEATURES, index=df.index)
     
     def create_labels(self, df: pd.DataFrame) -> pd.Series:
         """
         Create labels for LARGER price movements only
         This increases win rate by only trading significant moves
         """
-        c = df['close'].astype(float)
+        c = df['close'].to_numpy(dtype=np.float64)
         
         # Look 12 bars ahead (3 hours) - more time for move to develop
         look_ahead = 12
-        future_ret = (c.shift(-look_ahead) / c - 1) * 100
+        with np.errstate(divide='ignore', invalid='ignore'):
+            future_ret = (shift(c, -look_ahead) / c - 1) * 100
         
         # Higher threshold: 0.8% for BTC (significant move)
         threshold = 0.8
         
-        labels = pd.Series(1, index=df.index)  # HOLD
-        labels[future_ret > threshold] = 2     # Strong BUY
-        labels[future_ret < -threshold] = 0    # Strong SELL
-        
-        return labels
+        # Strong BUY above, strong SELL below, HOLD in between and for the unlabeled tail
+        labels = np.where(future_ret > threshold, 2, np.where(future_ret < -threshold, 0, 1))
+        return pd.Series(labels, index=df.index, dtype=np.int8)
     
     def train(self) -> dict:
         print(f"\n{'='*60}")
@@ -187,26 +186,25 @@ class HighWinRateBTCTrainer:
         features = self.calc_features(df)
         labels = self.create_labels(df)
         
-        data = pd.concat([features, labels.rename('label')], axis=1)
-        data = data.replace([np.inf, -np.inf], np.nan).dropna()
-        
-        print(f"\nSamples: {len(data)}")
-        lc = data['label'].value_counts().sort_index()
-        print(f"Labels: SELL={lc.get(0,0)} | HOLD={lc.get(1,0)} | BUY={lc.get(2,0)}")
+        # Keep rows where every feature is finite (labels are never NaN)
+        ok = np.isfinite(features.to_numpy()).all(axis=1)
+        X = features[self.FEATURES].to_numpy()[ok]
+        y = labels.to_numpy()[ok]
         
-        X = data[self.FEATURES].values
-        y = data['label'].values
+        print(f"\nSamples: {len(y)}")
+        lc = np.bincount(y, minlength=3)
+        print(f"Labels: SELL={lc[0]} | HOLD={lc[1]} | BUY={lc[2]}")
         
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
-        
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled, X_test_scaled, y_train, y_test = chrono_split_scale(X, y, self.scaler)
         
         # === ENSEMBLE OF 3 MODELS ===
         print("\n📊 Training Ensemble (3 models voting)...")
         
+        # Fit the members side by side on CPU, splitting the cores between
+        # them; a GPU member is fitted alone so it does not contend
+        voters = 3 if XGB_DEVICE == 'cpu' else 1
+        member_jobs = max(physical_cores() // voters, 1)
+        
         model1 = xgb.XGBClassifier(
             n_estimators=150,
             max_depth=5,
@@ -215,15 +213,21 @@ class HighWinRateBTCTrainer:
             subsample=0.8,
             random_state=42,
             use_label_encoder=False,
-            eval_metric='mlogloss'
+            eval_metric='mlogloss',
+            n_jobs=member_jobs,
+            **device_params()
         )
         
-        model2 = GradientBoostingClassifier(
-            n_estimators=150,
+        # Histogram boosting: binned splits, OpenMP threads capped per worker by joblib.
+        # A fixed round count; built-in early stopping would validate on a random
+        # 10% of bars, including future ones
+        model2 = HistGradientBoostingClassifier(
+            max_iter=150,
             max_depth=5,
             learning_rate=0.05,
-            min_samples_split=50,
-            subsample=0.8,
+            min_samples_leaf=50,
+            l2_regularization=1.0,
+            early_stopping=False,
             random_state=42
         )
         
@@ -232,8 +236,9 @@ class HighWinRateBTCTrainer:
             max_depth=10,
             min_samples_split=30,
             min_samples_leaf=15,
+            max_samples=0.5,  # Each tree bootstraps half the rows
             random_state=42,
-            n_jobs=-1
+            n_jobs=member_jobs
         )
         
         # Voting ensemble
@@ -243,68 +248,81 @@ class HighWinRateBTCTrainer:
                 ('gb', model2),
                 ('rf', model3)
             ],
-            voting='soft'  # Use probabilities
+            voting='soft',  # Use probabilities
+            n_jobs=voters
         )
         
         ensemble.fit(X_train_scaled, y_train)
+        # Evaluate and save on the CPU, where the live app predicts
+        to_cpu(ensemble.named_estimators_['xgb'])
         
-        y_pred = ensemble.predict(X_test_scaled)
         y_proba = ensemble.predict_proba(X_test_scaled)
+        # Same as ensemble.predict, without a second pass through all three models
+        y_pred = ensemble.classes_[np.argmax(y_proba, axis=1)]
         
         # === WIN RATE ANALYSIS WITH HIGH THRESHOLDS ===
         print("\n📈 Win Rate Analysis (High Confidence Only):")
         
+        # Trade and hit counts at every threshold at once, one column per threshold
+        thresholds = np.array([0.50, 0.55, 0.60, 0.65, 0.70, 0.75, 0.80])
+        confident_at = y_proba.max(axis=1)[:, None] >= thresholds
+        hit = (y_pred == y_test)[:, None]
+        buy_at = confident_at & (y_pred == 2)[:, None]
+        sell_at = confident_at & (y_pred == 0)[:, None]
+        trades_at = buy_at | sell_at  # Confident and not HOLD
+        counts = np.stack([
+            trades_at.sum(axis=0), (trades_at & hit).sum(axis=0),
+            buy_at.sum(axis=0), (buy_at & hit).sum(axis=0),
+            sell_at.sum(axis=0), (sell_at & hit).sum(axis=0),
+        ], axis=1)
+        sweep = dict(zip(thresholds.tolist(), counts))
+        
         best_result = {'threshold': 0.5, 'win_rate': 0, 'trades': 0, 'buy_prec': 0, 'sell_prec': 0}
+        # Report lines are written in one go after the sweep
+        rows = []
         
         for thresh in [0.50, 0.55, 0.60, 0.65, 0.70, 0.75]:
-            max_p = np.max(y_proba, axis=1)
-            confident = max_p >= thresh
-            trades = (y_pred != 1) & confident
+            n_trades, correct, n_buy, buy_hits, n_sell, sell_hits = sweep[thresh]
             
-            if trades.sum() > 0:
-                correct = (y_test[trades] == y_pred[trades]).sum()
-                wr = correct / trades.sum() * 100
-                pct = trades.sum() / len(y_test) * 100
+            if n_trades > 0:
+                wr = correct / n_trades * 100
+                pct = n_trades / len(y_test) * 100
                 
                 # Per-class precision
-                buy_mask = (y_pred == 2) & confident
-                sell_mask = (y_pred == 0) & confident
-                buy_prec = ((y_test[buy_mask] == 2).sum() / buy_mask.sum() * 100) if buy_mask.sum() > 0 else 0
-                sell_prec = ((y_test[sell_mask] == 0).sum() / sell_mask.sum() * 100) if sell_mask.sum() > 0 else 0
+                buy_prec = (buy_hits / n_buy * 100) if n_buy > 0 else 0
+                sell_prec = (sell_hits / n_sell * 100) if n_sell > 0 else 0
                 
                 status = "✅" if wr >= 50 else "⚠️"
-                print(f"  {status} Threshold {thresh:.0%}: Win {wr:.1f}%, Trades {trades.sum()} ({pct:.1f}%), BUY {buy_prec:.0f}%, SELL {sell_prec:.0f}%")
+                rows.append(f"  {status} Threshold {thresh:.0%}: Win {wr:.1f}%, Trades {n_trades} ({pct:.1f}%), BUY {buy_prec:.0f}%, SELL {sell_prec:.0f}%")
                 
                 # Select best threshold with >50% win rate
-                if wr >= 50 and trades.sum() > 5 and wr > best_result['win_rate']:
+                if wr >= 50 and n_trades > 5 and wr > best_result['win_rate']:
                     best_result = {
                         'threshold': thresh,
                         'win_rate': wr,
-                        'trades': int(trades.sum()),
+                        'trades': int(n_trades),
                         'buy_prec': buy_prec,
                         'sell_prec': sell_prec
                     }
         
+        if rows:
+            print("\n".join(rows))
+        
         # If no >50% found, use highest
         if best_result['win_rate'] < 50:
             print("\n⚠️ No threshold achieved >50% win rate with enough trades")
             # Find highest win rate regardless
             for thresh in [0.70, 0.75, 0.80]:
-                max_p = np.max(y_proba, axis=1)
-                confident = max_p >= thresh
-                trades = (y_pred != 1) & confident
-                if trades.sum() > 0:
-                    correct = (y_test[trades] == y_pred[trades]).sum()
-                    wr = correct / trades.sum() * 100
+                n_trades, correct, n_buy, buy_hits, n_sell, sell_hits = sweep[thresh]
+                if n_trades > 0:
+                    wr = correct / n_trades * 100
                     if wr > best_result['win_rate']:
-                        buy_mask = (y_pred == 2) & confident
-                        sell_mask = (y_pred == 0) & confident
-                        buy_prec = ((y_test[buy_mask] == 2).sum() / buy_mask.sum() * 100) if buy_mask.sum() > 0 else 0
-                        sell_prec = ((y_test[sell_mask] == 0).sum() / sell_mask.sum() * 100) if sell_mask.sum() > 0 else 0
+                        buy_prec = (buy_hits / n_buy * 100) if n_buy > 0 else 0
+                        sell_prec = (sell_hits / n_sell * 100) if n_sell > 0 else 0
                         best_result = {
                             'threshold': thresh,
                             'win_rate': wr,
-                            'trades': int(trades.sum()),
+                            'trades': int(n_trades),
                             'buy_prec': buy_prec,
                             'sell_prec': sell_prec
                         }
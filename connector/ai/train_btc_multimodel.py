@@ -14,9 +14,11 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 import xgboost as xgb
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.model_selection import train_test_split, TimeSeriesSplit
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 
@@ -28,12 +30,25 @@ try:
     from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
     from tensorflow.keras.callbacks import EarlyStopping
     LSTM_AVAILABLE = True
+    # float16 compute on GPU tensor cores; float32 on CPU, where half precision is slower
+    LSTM_DTYPE = 'mixed_float16' if tf.config.list_physical_devices('GPU') else 'float32'
 except ImportError:
     LSTM_AVAILABLE = False
     print("TensorFlow not available, skipping LSTM")
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
+from ai._btc_features import base_indicators
+from ai._parallel import physical_cores
+from ai._split import chrono_split_scale
+from ai._xgb import XGB_DEVICE, device_params, fit_early_stopped
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv
+from ai.indicators import diff, momentum_stack, rolling_mean, rolling_quantile
+
+
+def _fit_model(model, X, y):
+    """Fit one model; module level so joblib workers can unpickle it"""
+    return model.fit(X, y)
 
 
 class BTCMultiModelTrainer:
@@ -65,11 +80,7 @@ class BTCMultiModelTrainer:
         path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
         print(f"Loading BTC from {path}")
         
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df = df.rename(columns={'open_time': 'time'})
-        df['time'] = pd.to_datetime(df['time'].str.strip())
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_btc_csv)
         
         # Use last 1.5 years
         cutoff = df['time'].max() - pd.Timedelta(days=540)
@@ -80,83 +91,79 @@ class BTCMultiModelTrainer:
     
     def calc_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Calculate crypto-specific features"""
-        f = pd.DataFrame(index=df.index)
+        c = df['close'].to_numpy(dtype=np.float64)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        v = df['volume'].to_numpy(dtype=np.float64)
+        base = base_indicators(c, h, l, v)
+        # One column-major buffer; each feature is written straight into its column
+        out = np.empty((len(df), len(self.FEATURES)), order='F')
+        f = dict(zip(self.FEATURES, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mom = momentum_stack(c, (4, 16, 48, 5))
+            
+            # RSI (14) with divergence
+            rsi = base['rsi14']
+            f['rsi'][:] = rsi
+            f['rsi_divergence'][:] = diff(rsi, 5) - mom[:, 3]  # Price/RSI divergence
+            f['rsi_momentum'][:] = diff(rsi, 3)
+            
+            # MACD
+            macd, macd_sig = base['macd'], base['macd_sig']
+            f['macd'][:] = macd / c * 100
+            f['macd_signal'][:] = macd_sig / c * 100
+            f['macd_hist'][:] = (macd - macd_sig) / c * 100
+            above = macd > macd_sig
+            f['macd_cross'][:1] = above[:1]
+            np.not_equal(above[1:], above[:-1], out=f['macd_cross'][1:])
+            
+            # Bollinger Bands with breakout
+            sma20, std20 = base['sma20'], base['std20']
+            bb_up = sma20 + 2 * std20
+            bb_lo = sma20 - 2 * std20
+            bb_range = bb_up - bb_lo
+            f['bb_position'][:] = (c - bb_lo) / (bb_range + 1e-10)
+            f['bb_width'][:] = bb_range / sma20
+            f['bb_breakout'][:] = (c > bb_up) | (c < bb_lo)
+            
+            # EMA trend
+            ema9, ema21, ema50 = base['ema9'], base['ema21'], base['ema50']
+            np.sign(ema9 - ema21, out=f['ema_trend'])
+            f['ema_momentum'][:] = (c - ema21) / ema21 * 100
+            # +1/-1 when 9>21>50 / 9<21<50: the trend sign, kept where the 21/50 sign agrees
+            trend = f['ema_trend']
+            f['ema_alignment'][:] = np.where(trend == np.sign(ema21 - ema50), trend, 0.0)
+            
+            # ATR and volatility
+            atr_pct = np.divide(base['atr14'], c, out=f['atr_pct'])
+            atr_pct *= 100
+            f['volatility_regime'][:] = atr_pct > rolling_quantile(atr_pct, 50, 0.7)
+            
+            # Multi-timeframe momentum
+            f['momentum_1h'][:] = mom[:, 0]
+            f['momentum_4h'][:] = mom[:, 1]
+            f['momentum_12h'][:] = mom[:, 2]
+            
+            # Volume
+            vol_ma = base['vol_ma20']
+            vol_den = vol_ma + 1e-10
+            f['volume_ratio'][:] = v / vol_den
+            f['volume_trend'][:] = diff(vol_ma, 5) / vol_den
+            
+            # Trend strength
+            up_move = diff(h)
+            down_move = -diff(l)
+            plus_dm = rolling_mean(np.where(up_move > down_move, up_move, 0.0), 14)
+            minus_dm = rolling_mean(np.where(down_move > up_move, down_move, 0.0), 14)
+            f['trend_strength'][:] = np.abs(plus_dm - minus_dm) / (plus_dm + minus_dm + 1e-10)
+            
+            # Price position in range
+            high_20, low_20 = base['high20'], base['low20']
+            f['price_position'][:] = (c - low_20) / (high_20 - low_20 + 1e-10)
         
-        c = df['close'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        v = df['volume'].astype(float)
-        
-        # RSI (14) with divergence
-        delta = c.diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-        f['rsi'] = rsi
-        f['rsi_divergence'] = rsi.diff(5) - c.pct_change(5) * 100  # Price/RSI divergence
-        f['rsi_momentum'] = rsi.diff(3)
-        
-        # MACD
-        ema12 = c.ewm(span=12).mean()
-        ema26 = c.ewm(span=26).mean()
-        macd = ema12 - ema26
-        macd_sig = macd.ewm(span=9).mean()
-        f['macd'] = macd / c * 100
-        f['macd_signal'] = macd_sig / c * 100
-        f['macd_hist'] = (macd - macd_sig) / c * 100
-        f['macd_cross'] = ((macd > macd_sig) != (macd.shift(1) > macd_sig.shift(1))).astype(float)
-        
-        # Bollinger Bands with breakout
-        sma20 = c.rolling(20).mean()
-        std20 = c.rolling(20).std()
-        bb_up = sma20 + 2 * std20
-        bb_lo = sma20 - 2 * std20
-        f['bb_position'] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
-        f['bb_width'] = (bb_up - bb_lo) / sma20
-        f['bb_breakout'] = ((c > bb_up) | (c < bb_lo)).astype(float)
-        
-        # EMA trend
-        ema9 = c.ewm(span=9).mean()
-        ema21 = c.ewm(span=21).mean()
-        ema50 = c.ewm(span=50).mean()
-        f['ema_trend'] = np.sign(ema9 - ema21)
-        f['ema_momentum'] = (c - ema21) / ema21 * 100
-        f['ema_alignment'] = ((ema9 > ema21) & (ema21 > ema50)).astype(float) - \
-                            ((ema9 < ema21) & (ema21 < ema50)).astype(float)
-        
-        # ATR and volatility
-        tr = pd.concat([h - l, abs(h - c.shift()), abs(l - c.shift())], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean()
-        f['atr_pct'] = atr / c * 100
-        f['volatility_regime'] = (f['atr_pct'] > f['atr_pct'].rolling(50).quantile(0.7)).astype(float)
-        
-        # Multi-timeframe momentum
-        f['momentum_1h'] = c.pct_change(4) * 100
-        f['momentum_4h'] = c.pct_change(16) * 100
-        f['momentum_12h'] = c.pct_change(48) * 100
-        
-        # Volume
-        vol_ma = v.rolling(20).mean()
-        f['volume_ratio'] = v / (vol_ma + 1e-10)
-        f['volume_trend'] = vol_ma.diff(5) / (vol_ma + 1e-10)
-        
-        # Trend strength
-        plus_dm = ((h - h.shift()).where((h - h.shift()) > (l.shift() - l), 0)).rolling(14).mean()
-        minus_dm = ((l.shift() - l).where((l.shift() - l) > (h - h.shift()), 0)).rolling(14).mean()
-        f['trend_strength'] = abs(plus_dm - minus_dm) / (plus_dm + minus_dm + 1e-10)
-        
-        # Price position in range
-        high_20 = h.rolling(20).max()
-        low_20 = l.rolling(20).min()
-        f['price_position'] = (c - low_20) / (high_20 - low_20 + 1e-10)
-        
-        # Normalize
-        for col in f.columns:
-            if f[col].std() > 0:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
-        
-        return f
+        # Standardized once after the split, by the scaler fitted on the training rows
+        return pd.DataFrame(out, columns=self.FEATURES, index=df.index)
     
     def create_labels(self, df: pd.DataFrame) -> pd.Series:
         """Create trading labels for BTC"""
@@ -176,26 +183,33 @@ class BTCMultiModelTrainer:
         return labels
     
     def prepare_lstm_data(self, X: np.ndarray, y: np.ndarray):
-        """Prepare sequences for LSTM"""
-        X_seq, y_seq = [], []
-        for i in range(self.LOOKBACK, len(X)):
-            X_seq.append(X[i-self.LOOKBACK:i])
-            y_seq.append(y[i])
-        return np.array(X_seq), np.array(y_seq)
+        """
+        Prepare sequences for LSTM: sample ``i`` is the LOOKBACK rows
+        before ``y[LOOKBACK + i]``. The sequences are a read-only strided
+        view of X, so no (samples, LOOKBACK, features) copy is made.
+        """
+        windows = sliding_window_view(X, (self.LOOKBACK, X.shape[1]))[:-1, 0]
+        return windows, y[self.LOOKBACK:]
     
     def build_lstm_model(self, input_shape):
         """Build LSTM model"""
+        dtype = LSTM_DTYPE
         model = Sequential([
-            LSTM(64, input_shape=input_shape, return_sequences=True),
-            Dropout(0.2),
-            BatchNormalization(),
-            LSTM(32, return_sequences=False),
-            Dropout(0.2),
-            Dense(16, activation='relu'),
-            Dense(3, activation='softmax')
+            LSTM(64, input_shape=input_shape, return_sequences=True, dtype=dtype),
+            Dropout(0.2, dtype=dtype),
+            BatchNormalization(dtype=dtype),
+            LSTM(32, return_sequences=False, dtype=dtype),
+            Dropout(0.2, dtype=dtype),
+            Dense(16, activation='relu', dtype=dtype),
+            # Softmax in float32 keeps the class probabilities numerically stable
+            Dense(3, activation='softmax', dtype='float32')
         ])
+        optimizer = 'adam'
+        if dtype == 'mixed_float16':
+            # Scale the loss so small float16 gradients do not underflow
+            optimizer = keras.mixed_precision.LossScaleOptimizer(keras.optimizers.Adam())
         model.compile(
-            optimizer='adam',
+            optimizer=optimizer,
             loss='sparse_categorical_crossentropy',
             metrics=['accuracy']
         )
@@ -222,65 +236,65 @@ class BTCMultiModelTrainer:
         X = data[self.FEATURES].values
         y = data['label'].values
         
-        # Split
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
-        
-        # Scale
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled, X_test_scaled, y_train, y_test = chrono_split_scale(X, y, self.scaler)
         
         results = {}
         
-        # 1. XGBoost
-        print("\n📊 Training XGBoost...")
-        xgb_model = xgb.XGBClassifier(
-            n_estimators=150,
-            max_depth=7,
-            learning_rate=0.05,
-            min_child_weight=5,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42,
-            use_label_encoder=False,
-            eval_metric='mlogloss'
-        )
-        xgb_model.fit(X_train_scaled, y_train)
-        xgb_pred = xgb_model.predict(X_test_scaled)
-        xgb_proba = xgb_model.predict_proba(X_test_scaled)
-        results['XGBoost'] = self._evaluate(y_test, xgb_pred, xgb_proba, xgb_model)
-        
-        # 2. Gradient Boosting
-        print("\n📊 Training Gradient Boosting...")
-        gb_model = GradientBoostingClassifier(
-            n_estimators=150,
-            max_depth=5,
-            learning_rate=0.05,
-            min_samples_split=50,
-            subsample=0.8,
-            random_state=42
-        )
-        gb_model.fit(X_train_scaled, y_train)
-        gb_pred = gb_model.predict(X_test_scaled)
-        gb_proba = gb_model.predict_proba(X_test_scaled)
-        results['GradientBoosting'] = self._evaluate(y_test, gb_pred, gb_proba, gb_model)
-        
-        # 3. Random Forest
-        print("\n📊 Training Random Forest...")
-        rf_model = RandomForestClassifier(
-            n_estimators=150,
-            max_depth=12,
-            min_samples_split=30,
-            min_samples_leaf=15,
-            class_weight='balanced',
-            random_state=42,
-            n_jobs=-1
+        # Fit the three tree models side by side on CPU, splitting the cores
+        # between them; a GPU XGBoost fit runs alone so it does not contend
+        n_parallel = min(3, physical_cores()) if XGB_DEVICE == 'cpu' else 1
+        member_jobs = max(physical_cores() // n_parallel, 1)
+        
+        models = {
+            # 1. XGBoost
+            'XGBoost': xgb.XGBClassifier(
+                n_estimators=300,  # Ceiling; early stopping picks the round count
+                max_depth=7,
+                learning_rate=0.05,
+                min_child_weight=5,
+                subsample=0.8,
+                colsample_bytree=0.8,
+                random_state=42,
+                eval_metric='mlogloss',
+                early_stopping_rounds=20,
+                n_jobs=member_jobs,
+                **device_params()
+            ),
+            # 2. Gradient Boosting: histogram splits for a fixed round count; built-in early
+            # stopping would validate on a random 10% of bars, including future ones
+            'GradientBoosting': HistGradientBoostingClassifier(
+                max_iter=150,
+                max_depth=5,
+                learning_rate=0.05,
+                min_samples_leaf=50,
+                max_bins=255,
+                early_stopping=False,
+                random_state=42
+            ),
+            # 3. Random Forest
+            'RandomForest': RandomForestClassifier(
+                n_estimators=150,
+                max_depth=12,
+                min_samples_split=30,
+                min_samples_leaf=15,
+                class_weight='balanced',
+                random_state=42,
+                n_jobs=member_jobs
+            ),
+        }
+        
+        print(f"\n📊 Training {', '.join(models)}...")
+        fitters = {'XGBoost': fit_early_stopped}
+        fitted = Parallel(n_jobs=n_parallel)(
+            delayed(fitters.get(name, _fit_model))(model, X_train_scaled, y_train)
+            for name, model in models.items()
         )
-        rf_model.fit(X_train_scaled, y_train)
-        rf_pred = rf_model.predict(X_test_scaled)
-        rf_proba = rf_model.predict_proba(X_test_scaled)
-        results['RandomForest'] = self._evaluate(y_test, rf_pred, rf_proba, rf_model)
+        print(f"   XGBoost stopped at {fitted[0].best_iteration + 1} trees")
+        
+        for name, model in zip(models, fitted):
+            pred = model.predict(X_test_scaled)
+            proba = model.predict_proba(X_test_scaled)
+            results[name] = self._evaluate(y_test, pred, proba, model)
         
         # 4. LSTM (if available)
         if LSTM_AVAILABLE:
@@ -334,19 +348,22 @@ class BTCMultiModelTrainer:
         best_thresh = 0.5
         best_trades = 0
         
+        # Trade and hit counts at every threshold at once, one column per threshold
+        thresholds = np.array([0.40, 0.45, 0.50, 0.55, 0.60])
+        trades_at = (y_proba.max(axis=1)[:, None] >= thresholds) & (y_pred != 1)[:, None]
+        hit = (y_true == y_pred)[:, None]
+        sweep = dict(zip(thresholds.tolist(), zip(trades_at.sum(axis=0), (trades_at & hit).sum(axis=0))))
+        
         for thresh in [0.40, 0.45, 0.50, 0.55, 0.60]:
-            max_p = np.max(y_proba, axis=1)
-            conf = max_p >= thresh
-            trades = (y_pred != 1) & conf
+            n_trades, correct = sweep[thresh]
             
-            if trades.sum() > 0:
-                correct = (y_true[trades] == y_pred[trades]).sum()
-                wr = correct / trades.sum() * 100
+            if n_trades > 0:
+                wr = correct / n_trades * 100
                 
-                if wr > best_wr and trades.sum() > 20:
+                if wr > best_wr and n_trades > 20:
                     best_wr = wr
                     best_thresh = thresh
-                    best_trades = trades.sum()
+                    best_trades = n_trades
         
         return {
             'model': model,
@@ -399,7 +416,7 @@ class BTCMultiModelTrainer:
             'trained_at': datetime.now().isoformat()
         }
         
-        secured = self.security.encrypt_model(pkg, model_id, meta)
+        secured = self.security.encrypt_model(pkg, model_id, meta, compress=True)
         path = self.security.save_secured_model(secured)
         
         print(f"\n✅ Best Model Saved: {model_id}")
@@ -12,12 +12,16 @@ warnings.filterwarnings('ignore')
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
+from ai._btc_features import base_indicators
+from ai._split import chrono_split_scale
+from ai._xgb import device_params, fit_early_stopped
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv
+from ai.indicators import diff, momentum_stack, shift
 
 
 class TrendFollowingBTCTrainer:
@@ -43,11 +47,7 @@ class TrendFollowingBTCTrainer:
         path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
         print(f"Loading BTC from {path}")
         
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df = df.rename(columns={'open_time': 'time'})
-        df['time'] = pd.to_datetime(df['time'].str.strip())
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_btc_csv)
         
         cutoff = df['time'].max() - pd.Timedelta(days=730)
         df = df[df['time'] >= cutoff].reset_index(drop=True)
@@ -57,59 +57,55 @@ class TrendFollowingBTCTrainer:
     
     def calc_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Simple but effective trend indicators"""
-        f = pd.DataFrame(index=df.index)
-        
-        c = df['close'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        v = df['volume'].astype(float)
-        
-        # Simple trend: price above/below 50 EMA
-        ema50 = c.ewm(span=50).mean()
-        f['trend_dir'] = np.sign(c - ema50)
-        
-        # Trend strength (distance from EMA)
-        f['trend_strength'] = abs(c - ema50) / ema50 * 100
-        
-        # Trend age (how long has price been above/below EMA)
-        above_ema = (c > ema50).astype(int)
-        f['trend_age'] = above_ema.groupby((above_ema != above_ema.shift()).cumsum()).cumcount()
-        f['trend_age'] = f['trend_age'] / 100  # Normalize
-        
-        # Momentum (rate of change)
-        f['momentum'] = c.pct_change(8) * 100  # 2 hours
-        f['momentum_accel'] = f['momentum'].diff(4)
-        
-        # RSI
-        delta = c.diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        f['rsi'] = 100 - (100 / (1 + rs))
-        
-        # RSI zone: 0=oversold, 1=neutral, 2=overbought
-        f['rsi_zone'] = 1
-        f.loc[f['rsi'] < 30, 'rsi_zone'] = 0
-        f.loc[f['rsi'] > 70, 'rsi_zone'] = 2
-        
-        # Price position in recent range
-        high_20 = h.rolling(20).max()
-        low_20 = l.rolling(20).min()
-        f['price_position'] = (c - low_20) / (high_20 - low_20 + 1e-10)
-        
-        # Breakout
-        f['breakout'] = ((c > high_20.shift(1)) | (c < low_20.shift(1))).astype(float)
-        
-        # Volume supporting move
-        vol_ma = v.rolling(20).mean()
-        f['volume_support'] = (v > vol_ma).astype(float)
-        
-        # Normalize
-        for col in ['trend_strength', 'trend_age', 'momentum', 'momentum_accel', 'rsi', 'price_position']:
-            if f[col].std() > 0:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
+        c = df['close'].to_numpy(dtype=np.float64)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        v = df['volume'].to_numpy(dtype=np.float64)
+        base = base_indicators(c, h, l, v)
+        # One column-major buffer; each feature is written straight into its column
+        out = np.empty((len(df), len(self.FEATURES)), order='F')
+        f = dict(zip(self.FEATURES, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Simple trend: price above/below 50 EMA
+            ema50 = base['ema50']
+            np.sign(c - ema50, out=f['trend_dir'])
+            
+            # Trend strength (distance from EMA)
+            f['trend_strength'][:] = np.abs(c - ema50) / ema50 * 100
+            
+            # Trend age (how long has price been above/below EMA)
+            above_ema = c > ema50
+            idx = np.arange(len(c))
+            run_start = np.ones(len(c), dtype=bool)
+            np.not_equal(above_ema[1:], above_ema[:-1], out=run_start[1:])
+            f['trend_age'][:] = idx - np.maximum.accumulate(np.where(run_start, idx, 0))
+            f['trend_age'] /= 100  # Normalize
+            
+            # Momentum (rate of change)
+            momentum = momentum_stack(c, (8,))[:, 0]  # 2 hours
+            f['momentum'][:] = momentum
+            f['momentum_accel'][:] = diff(momentum, 4)
+            
+            # RSI
+            rsi = base['rsi14']
+            f['rsi'][:] = rsi
+            
+            # RSI zone: 0=oversold, 1=neutral, 2=overbought
+            f['rsi_zone'][:] = np.where(rsi < 30, 0.0, np.where(rsi > 70, 2.0, 1.0))
+            
+            # Price position in recent range
+            high_20, low_20 = base['high20'], base['low20']
+            f['price_position'][:] = (c - low_20) / (high_20 - low_20 + 1e-10)
+            
+            # Breakout
+            f['breakout'][:] = (c > shift(high_20, 1)) | (c < shift(low_20, 1))
+            
+            # Volume supporting move
+            f['volume_support'][:] = v > base['vol_ma20']
         
-        return f
+        # Standardized once after the split, by the scaler fitted on the training rows
+        return pd.DataFrame(out, columns=self.FEATURES, index=df.index)
     
     def create_labels(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -156,16 +152,11 @@ class TrendFollowingBTCTrainer:
         X = data[self.FEATURES].values
         y = data['label'].values
         
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
-        
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled, X_test_scaled, y_train, y_test = chrono_split_scale(X, y, self.scaler)
         
         print("\n📊 Training XGBoost...")
         model = xgb.XGBClassifier(
-            n_estimators=200,
+            n_estimators=400,  # Ceiling; early stopping picks the round count
             max_depth=6,
             learning_rate=0.03,
             min_child_weight=5,
@@ -173,10 +164,12 @@ class TrendFollowingBTCTrainer:
             colsample_bytree=0.8,
             scale_pos_weight=1.5,  # Slightly favor minority classes
             random_state=42,
-            use_label_encoder=False,
-            eval_metric='mlogloss'
+            eval_metric='mlogloss',
+            early_stopping_rounds=20,
+            **device_params()
         )
-        model.fit(X_train_scaled, y_train)
+        fit_early_stopped(model, X_train_scaled, y_train)
+        print(f"   Stopped at {model.best_iteration + 1} trees")
         
         y_pred = model.predict(X_test_scaled)
         y_proba = model.predict_proba(X_test_scaled)
@@ -184,25 +177,34 @@ class TrendFollowingBTCTrainer:
         print("\n📈 Win Rate Analysis:")
         best = {'threshold': 0.4, 'win_rate': 0, 'trades': 0, 'buy_prec': 0, 'sell_prec': 0}
         
+        # Trade and hit counts at every threshold at once, one column per threshold
+        thresholds = np.array([0.35, 0.40, 0.45, 0.50, 0.55, 0.60])
+        confident_at = y_proba.max(axis=1)[:, None] >= thresholds
+        hit = (y_pred == y_test)[:, None]
+        buy_at = confident_at & (y_pred == 2)[:, None]
+        sell_at = confident_at & (y_pred == 0)[:, None]
+        trades_at = buy_at | sell_at  # Confident and not HOLD
+        counts = np.stack([
+            trades_at.sum(axis=0), (trades_at & hit).sum(axis=0),
+            buy_at.sum(axis=0), (buy_at & hit).sum(axis=0),
+            sell_at.sum(axis=0), (sell_at & hit).sum(axis=0),
+        ], axis=1)
+        sweep = dict(zip(thresholds.tolist(), counts))
+        
         for thresh in [0.35, 0.40, 0.45, 0.50, 0.55, 0.60]:
-            max_p = np.max(y_proba, axis=1)
-            conf = max_p >= thresh
-            trades = (y_pred != 1) & conf
+            n_trades, correct, n_buy, buy_hits, n_sell, sell_hits = sweep[thresh]
             
-            if trades.sum() > 10:
-                correct = (y_test[trades] == y_pred[trades]).sum()
-                wr = correct / trades.sum() * 100
+            if n_trades > 10:
+                wr = correct / n_trades * 100
                 
-                buy_mask = (y_pred == 2) & conf
-                sell_mask = (y_pred == 0) & conf
-                buy_prec = ((y_test[buy_mask] == 2).sum() / buy_mask.sum() * 100) if buy_mask.sum() > 0 else 0
-                sell_prec = ((y_test[sell_mask] == 0).sum() / sell_mask.sum() * 100) if sell_mask.sum() > 0 else 0
+                buy_prec = (buy_hits / n_buy * 100) if n_buy > 0 else 0
+                sell_prec = (sell_hits / n_sell * 100) if n_sell > 0 else 0
                 
                 marker = "✅" if wr >= 50 else "⚠️"
-                print(f"  {marker} {thresh:.0%}: Win {wr:.1f}%, Trades {trades.sum()}, BUY {buy_prec:.0f}%, SELL {sell_prec:.0f}%")
+                print(f"  {marker} {thresh:.0%}: Win {wr:.1f}%, Trades {n_trades}, BUY {buy_prec:.0f}%, SELL {sell_prec:.0f}%")
                 
-                if wr > best['win_rate'] and trades.sum() >= 20:
-                    best = {'threshold': thresh, 'win_rate': wr, 'trades': int(trades.sum()),
+                if wr > best['win_rate'] and n_trades >= 20:
+                    best = {'threshold': thresh, 'win_rate': wr, 'trades': int(n_trades),
                            'buy_prec': buy_prec, 'sell_prec': sell_prec}
         
         acc = accuracy_score(y_test, y_pred)
@@ -249,7 +251,7 @@ class TrendFollowingBTCTrainer:
             **result['metrics']
         }
         
-        secured = self.security.encrypt_model(pkg, model_id, meta)
+        secured = self.security.encrypt_model(pkg, model_id, meta, compress=True)
         path = self.security.save_secured_model(secured)
         
         print(f"\n✅ Saved: {model_id}")
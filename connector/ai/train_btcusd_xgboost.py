@@ -1,5 +1,5 @@
 """
-BTC XGBoost Optimized Trainer with GridSearchCV
+BTC XGBoost Optimized Trainer with successive-halving grid search
 Crypto-specific tuning for maximum win rate
 """
 
@@ -12,12 +12,18 @@ warnings.filterwarnings('ignore')
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split, GridSearchCV, TimeSeriesSplit
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV, TimeSeriesSplit
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
+from ai._btc_features import base_indicators
+from ai._split import chrono_split_scale
+from ai._xgb import XGB_DEVICE, device_params, to_cpu
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv
+from ai.indicators import diff, momentum_stack, rolling_mean, rolling_quantile, zscore_columns
 
 
 class BTCXGBoostTrainer:
@@ -44,11 +50,7 @@ class BTCXGBoostTrainer:
         path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
         print(f"Loading BTC from {path}")
         
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df = df.rename(columns={'open_time': 'time'})
-        df['time'] = pd.to_datetime(df['time'].str.strip())
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_btc_csv)
         
         # Use 2 years for better pattern recognition
         cutoff = df['time'].max() - pd.Timedelta(days=730)
@@ -59,84 +61,76 @@ class BTCXGBoostTrainer:
     
     def calc_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Calculate optimized crypto features"""
-        f = pd.DataFrame(index=df.index)
+        c = df['close'].to_numpy(dtype=np.float64)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        v = df['volume'].to_numpy(dtype=np.float64)
+        base = base_indicators(c, h, l, v)
+        # One column-major buffer; each feature is written straight into its column
+        out = np.empty((len(df), len(self.FEATURES)), order='F')
+        f = dict(zip(self.FEATURES, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI with patterns
+            rsi = base['rsi14']
+            f['rsi'][:] = rsi
+            f['rsi_momentum'][:] = diff(rsi, 3)
+            f['rsi_extreme'][:] = (rsi < 30) | (rsi > 70)
+            
+            # MACD
+            macd, macd_sig = base['macd'], base['macd_sig']
+            f['macd'][:] = macd / c * 100
+            f['macd_hist'][:] = (macd - macd_sig) / c * 100
+            f['macd_bullish'][:] = macd > macd_sig
+            
+            # Bollinger Bands
+            sma20, std20 = base['sma20'], base['std20']
+            bb_up = sma20 + 2 * std20
+            bb_lo = sma20 - 2 * std20
+            f['bb_position'][:] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
+            f['bb_width'][:] = (bb_up - bb_lo) / sma20
+            f['bb_breakout'][:] = (c > bb_up) | (c < bb_lo)
+            
+            # EMA alignment
+            ema9, ema21, ema50 = base['ema9'], base['ema21'], base['ema50']
+            f['ema_alignment'][:] = (ema9 > ema21) & (ema21 > ema50)
+            f['ema_alignment'] -= (ema9 < ema21) & (ema21 < ema50)
+            f['ema_momentum'][:] = (c - ema21) / ema21 * 100
+            
+            # ATR
+            atr_pct = np.divide(base['atr14'], c, out=f['atr_pct'])
+            atr_pct *= 100
+            f['volatility_high'][:] = atr_pct > rolling_quantile(atr_pct, 50, 0.75)
+            
+            # Momentum
+            mom = momentum_stack(c, (4, 16))
+            f['momentum_1h'][:] = mom[:, 0]
+            f['momentum_4h'][:] = mom[:, 1]
+            f['momentum_dir'][:] = np.sign(mom[:, 0]) == np.sign(mom[:, 1])
+            
+            # Volume
+            vol_ma = base['vol_ma20']
+            f['volume_surge'][:] = v > vol_ma * 1.5
+            f['volume_trend'][:] = diff(vol_ma, 5) / (vol_ma + 1e-10)
+            
+            # ADX
+            up_move = diff(h)
+            down_move = -diff(l)
+            plus_dm = rolling_mean(np.where(up_move > down_move, up_move, 0.0), 14)
+            minus_dm = rolling_mean(np.where(down_move > up_move, down_move, 0.0), 14)
+            f['trend_adx'][:] = np.abs(plus_dm - minus_dm) / (plus_dm + minus_dm + 1e-10)
+            
+            # Price strength
+            high_20, low_20 = base['high20'], base['low20']
+            f['price_strength'][:] = (c - low_20) / (high_20 - low_20 + 1e-10)
         
-        c = df['close'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        v = df['volume'].astype(float)
-        
-        # RSI with patterns
-        delta = c.diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-        f['rsi'] = rsi
-        f['rsi_momentum'] = rsi.diff(3)
-        f['rsi_extreme'] = ((rsi < 30) | (rsi > 70)).astype(float)
-        
-        # MACD
-        ema12 = c.ewm(span=12).mean()
-        ema26 = c.ewm(span=26).mean()
-        macd = ema12 - ema26
-        macd_sig = macd.ewm(span=9).mean()
-        f['macd'] = macd / c * 100
-        f['macd_hist'] = (macd - macd_sig) / c * 100
-        f['macd_bullish'] = (macd > macd_sig).astype(float)
-        
-        # Bollinger Bands
-        sma20 = c.rolling(20).mean()
-        std20 = c.rolling(20).std()
-        bb_up = sma20 + 2 * std20
-        bb_lo = sma20 - 2 * std20
-        f['bb_position'] = (c - bb_lo) / (bb_up - bb_lo + 1e-10)
-        f['bb_width'] = (bb_up - bb_lo) / sma20
-        f['bb_breakout'] = ((c > bb_up) | (c < bb_lo)).astype(float)
-        
-        # EMA alignment
-        ema9 = c.ewm(span=9).mean()
-        ema21 = c.ewm(span=21).mean()
-        ema50 = c.ewm(span=50).mean()
-        f['ema_alignment'] = ((ema9 > ema21) & (ema21 > ema50)).astype(float) - \
-                            ((ema9 < ema21) & (ema21 < ema50)).astype(float)
-        f['ema_momentum'] = (c - ema21) / ema21 * 100
-        
-        # ATR
-        tr = pd.concat([h - l, abs(h - c.shift()), abs(l - c.shift())], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean()
-        f['atr_pct'] = atr / c * 100
-        f['volatility_high'] = (f['atr_pct'] > f['atr_pct'].rolling(50).quantile(0.75)).astype(float)
-        
-        # Momentum
-        f['momentum_1h'] = c.pct_change(4) * 100
-        f['momentum_4h'] = c.pct_change(16) * 100
-        f['momentum_dir'] = (np.sign(f['momentum_1h']) == np.sign(f['momentum_4h'])).astype(float)
-        
-        # Volume
-        vol_ma = v.rolling(20).mean()
-        f['volume_surge'] = (v > vol_ma * 1.5).astype(float)
-        f['volume_trend'] = (vol_ma.diff(5) / (vol_ma + 1e-10))
-        
-        # ADX
-        plus_dm = ((h - h.shift()).where((h - h.shift()) > (l.shift() - l), 0)).rolling(14).mean()
-        minus_dm = ((l.shift() - l).where((l.shift() - l) > (h - h.shift()), 0)).rolling(14).mean()
-        f['trend_adx'] = abs(plus_dm - minus_dm) / (plus_dm + minus_dm + 1e-10)
-        
-        # Price strength
-        high_20 = h.rolling(20).max()
-        low_20 = l.rolling(20).min()
-        f['price_strength'] = (c - low_20) / (high_20 - low_20 + 1e-10)
-        
-        # Normalize continuous
+        # Normalize the continuous columns in one parallel pass
         norm_cols = ['rsi', 'rsi_momentum', 'macd', 'macd_hist', 'bb_position', 
                      'bb_width', 'ema_momentum', 'atr_pct', 'momentum_1h', 
                      'momentum_4h', 'volume_trend', 'trend_adx', 'price_strength']
-        for col in norm_cols:
-            if col in f.columns and f[col].std() > 0:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
+        zscore_columns(out, [self.FEATURES.index(col) for col in norm_cols])
         
-        return f
+        return pd.DataFrame(out, columns=self.FEATURES, index=df.index)
     
     def create_labels(self, df: pd.DataFrame) -> pd.Series:
         """Labels with crypto-appropriate thresholds"""
@@ -163,28 +157,21 @@ class BTCXGBoostTrainer:
         features = self.calc_features(df)
         labels = self.create_labels(df)
         
-        data = pd.concat([features, labels.rename('label')], axis=1)
-        data = data.replace([np.inf, -np.inf], np.nan).dropna()
-        
-        print(f"\nSamples: {len(data)}")
-        lc = data['label'].value_counts().sort_index()
-        print(f"Labels: SELL={lc.get(0,0)} | HOLD={lc.get(1,0)} | BUY={lc.get(2,0)}")
+        # Keep rows where every feature is finite (labels are never NaN)
+        ok = np.isfinite(features.to_numpy()).all(axis=1)
+        X = features[self.FEATURES].to_numpy()[ok]
+        y = labels.to_numpy()[ok]
         
-        X = data[self.FEATURES].values
-        y = data['label'].values
+        print(f"\nSamples: {len(y)}")
+        lc = np.bincount(y, minlength=3)
+        print(f"Labels: SELL={lc[0]} | HOLD={lc[1]} | BUY={lc[2]}")
         
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
-        
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled, X_test_scaled, y_train, y_test = chrono_split_scale(X, y, self.scaler)
         
         print("\n📊 Hyperparameter Tuning...")
         
         param_grid = {
             'max_depth': [5, 7, 10],
-            'n_estimators': [100, 150, 200],
             'learning_rate': [0.03, 0.05, 0.1],
             'min_child_weight': [3, 5, 7],
             'subsample': [0.8],
@@ -196,17 +183,27 @@ class BTCXGBoostTrainer:
             objective='multi:softprob',
             random_state=42,
             use_label_encoder=False,
-            eval_metric='mlogloss'
+            eval_metric='mlogloss',
+            **device_params()
         )
         
         tscv = TimeSeriesSplit(n_splits=3)
-        grid = GridSearchCV(base, param_grid, cv=tscv, scoring='accuracy', n_jobs=-1, verbose=1)
+        # Each GPU fit already occupies the whole device; run them one at a time
+        search_jobs = -1 if XGB_DEVICE == 'cpu' else 1
+        # Successive halving over the tree count: every candidate gets 22 trees,
+        # the best third 66, the best ninth 198
+        grid = HalvingGridSearchCV(
+            base, param_grid, cv=tscv, scoring='accuracy',
+            factor=3, resource='n_estimators', min_resources=22, max_resources=200,
+            n_jobs=search_jobs, verbose=1
+        )
         grid.fit(X_train_scaled, y_train)
         
         print(f"\n✅ Best params: {grid.best_params_}")
         print(f"   Best CV: {grid.best_score_:.2%}")
         
-        model = grid.best_estimator_
+        # Evaluate and save on the CPU, where the live app predicts
+        model = to_cpu(grid.best_estimator_)
         y_pred = model.predict(X_test_scaled)
         y_proba = model.predict_proba(X_test_scaled)
         
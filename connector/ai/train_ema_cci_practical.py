@@ -12,12 +12,14 @@ warnings.filterwarnings('ignore')
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 from sklearn.preprocessing import StandardScaler
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from security.model_security import ModelSecurity
+from ai._split import chrono_split_scale
+from ai.ohlcv_cache import load_csv_cached, parse_btc_csv, parse_xau_csv
+from ai.indicators import ewm_mean, momentum_stack, rolling_mad, rolling_mean, shift, zscore_columns
 
 
 class PracticalEMACCITrainer:
@@ -48,79 +50,74 @@ class PracticalEMACCITrainer:
     
     def load_btc(self) -> pd.DataFrame:
         path = self.ohlcv_dir / "btc" / "btc_15m_data_2018_to_2025.csv"
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df = df.rename(columns={'open_time': 'time'})
-        df['time'] = pd.to_datetime(df['time'].str.strip())
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_btc_csv)
         cutoff = df['time'].max() - pd.Timedelta(days=730)
         return df[df['time'] >= cutoff].reset_index(drop=True)
     
     def load_xauusd(self) -> pd.DataFrame:
         path = self.ohlcv_dir / "xauusd" / "XAU_15m_data.csv"
-        df = pd.read_csv(path, sep=';')
-        df.columns = [c.strip().lower() for c in df.columns]
-        df = df.rename(columns={'date': 'time'})
-        df['time'] = pd.to_datetime(df['time'])
-        df = df.sort_values('time').reset_index(drop=True)
+        df = load_csv_cached(path, parse_xau_csv)
         cutoff = df['time'].max() - pd.Timedelta(days=730)
         return df[df['time'] >= cutoff].reset_index(drop=True)
     
     def calc_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        f = pd.DataFrame(index=df.index)
-        
-        c = df['close'].astype(float)
-        h = df['high'].astype(float)
-        l = df['low'].astype(float)
-        
-        # EMAs
-        ema50 = c.ewm(span=50).mean()
-        ema110 = c.ewm(span=110).mean()
-        ema200 = c.ewm(span=200).mean()
-        
-        # EMA alignment
-        f['ema_bullish'] = ((ema50 > ema110) & (ema110 > ema200)).astype(float)
-        f['ema_bearish'] = ((ema50 < ema110) & (ema110 < ema200)).astype(float)
-        f['price_above_ema50'] = (c > ema50).astype(float)
-        f['price_above_ema200'] = (c > ema200).astype(float)
-        
-        # EMA slopes
-        f['ema50_slope'] = ema50.pct_change(5) * 100
-        f['ema200_slope'] = ema200.pct_change(5) * 100
-        
-        # Distance from EMA200
-        f['dist_ema200_pct'] = (c - ema200) / ema200 * 100
-        
-        # CCI calculation
-        tp = (h + l + c) / 3
-        sma_tp = tp.rolling(20).mean()
-        mean_dev = tp.rolling(20).apply(lambda x: np.abs(x - x.mean()).mean())
-        cci = (tp - sma_tp) / (0.015 * mean_dev)
-        
-        f['cci'] = cci
-        # Buy zone: -100 to 0 (oversold recovery)
-        f['cci_buy_zone'] = ((cci >= -100) & (cci <= 0)).astype(float)
-        # Sell zone: 0 to 100 (overbought)
-        f['cci_sell_zone'] = ((cci >= 0) & (cci <= 100)).astype(float)
-        f['cci_rising'] = (cci > cci.shift(2)).astype(float)
-        f['cci_falling'] = (cci < cci.shift(2)).astype(float)
-        
-        # Combined setup signals
-        f['buy_setup'] = ((f['ema_bullish'] == 1) & (f['cci_buy_zone'] == 1) & (f['cci_rising'] == 1)).astype(float)
-        f['sell_setup'] = ((f['ema_bearish'] == 1) & (f['cci_sell_zone'] == 1) & (f['cci_falling'] == 1)).astype(float)
-        
-        # Trend strength
-        f['trend_strength'] = abs(ema50 - ema200) / ema200 * 100
-        
-        # Momentum
-        f['momentum'] = c.pct_change(4) * 100
+        c = df['close'].to_numpy(dtype=np.float64)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        # One column-major buffer; each feature is written straight into its column
+        out = np.empty((len(df), len(self.FEATURES)), order='F')
+        f = dict(zip(self.FEATURES, out.T))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # EMAs
+            ema50, ema110, ema200 = ewm_mean(c, (50, 110, 200)).T
+            
+            # EMA alignment
+            bullish = (ema50 > ema110) & (ema110 > ema200)
+            bearish = (ema50 < ema110) & (ema110 < ema200)
+            f['ema_bullish'][:] = bullish
+            f['ema_bearish'][:] = bearish
+            f['price_above_ema50'][:] = c > ema50
+            f['price_above_ema200'][:] = c > ema200
+            
+            # EMA slopes
+            f['ema50_slope'][:] = momentum_stack(ema50, (5,))[:, 0]
+            f['ema200_slope'][:] = momentum_stack(ema200, (5,))[:, 0]
+            
+            # Distance from EMA200
+            f['dist_ema200_pct'][:] = (c - ema200) / ema200 * 100
+            
+            # CCI calculation
+            tp = (h + l + c) / 3
+            cci = np.divide(tp - rolling_mean(tp, 20), 0.015 * rolling_mad(tp, 20), out=f['cci'])
+            
+            # Buy zone: -100 to 0 (oversold recovery)
+            buy_zone = (cci >= -100) & (cci <= 0)
+            # Sell zone: 0 to 100 (overbought)
+            sell_zone = (cci >= 0) & (cci <= 100)
+            cci_prev = shift(cci, 2)
+            rising = cci > cci_prev
+            falling = cci < cci_prev
+            f['cci_buy_zone'][:] = buy_zone
+            f['cci_sell_zone'][:] = sell_zone
+            f['cci_rising'][:] = rising
+            f['cci_falling'][:] = falling
+            
+            # Combined setup signals
+            f['buy_setup'][:] = bullish & buy_zone & rising
+            f['sell_setup'][:] = bearish & sell_zone & falling
+            
+            # Trend strength
+            f['trend_strength'][:] = np.abs(ema50 - ema200) / ema200 * 100
+            
+            # Momentum
+            f['momentum'][:] = momentum_stack(c, (4,))[:, 0]
         
-        # Normalize
-        for col in ['cci', 'ema50_slope', 'ema200_slope', 'dist_ema200_pct', 'trend_strength', 'momentum']:
-            if f[col].std() > 0:
-                f[col] = (f[col] - f[col].mean()) / f[col].std()
+        # Normalize the continuous columns in one parallel pass
+        norm_cols = ['cci', 'ema50_slope', 'ema200_slope', 'dist_ema200_pct', 'trend_strength', 'momentum']
+        zscore_columns(out, [self.FEATURES.index(col) for col in norm_cols])
         
-        return f
+        return pd.DataFrame(out, columns=self.FEATURES, index=df.index)
     
     def create_labels(self, df: pd.DataFrame, symbol: str) -> pd.Series:
         """
@@ -153,22 +150,16 @@ class PracticalEMACCITrainer:
         features = self.calc_features(df)
         labels = self.create_labels(df, symbol)
         
-        data = pd.concat([features, labels.rename('label')], axis=1)
-        data = data.replace([np.inf, -np.inf], np.nan).dropna()
-        
-        print(f"Samples: {len(data)}")
-        lc = data['label'].value_counts().sort_index()
-        print(f"SELL: {lc.get(0,0)} | HOLD: {lc.get(1,0)} | BUY: {lc.get(2,0)}")
+        # Keep rows where every feature is finite (labels are never NaN)
+        ok = np.isfinite(features.to_numpy()).all(axis=1)
+        X = features[self.FEATURES].to_numpy()[ok]
+        y = labels.to_numpy()[ok]
         
-        X = data[self.FEATURES].values
-        y = data['label'].values
-        
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, shuffle=False
-        )
+        print(f"Samples: {len(y)}")
+        lc = np.bincount(y, minlength=3)
+        print(f"SELL: {lc[0]} | HOLD: {lc[1]} | BUY: {lc[2]}")
         
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled, X_test_scaled, y_train, y_test = chrono_split_scale(X, y, self.scaler)
         
         print("\n📊 Training...")
         model = xgb.XGBClassifier(
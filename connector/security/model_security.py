@@ -6,12 +6,15 @@ Handles encryption, HWID binding, and integrity verification of ML models
 import os
 import json
 import hashlib
+import multiprocessing
 import platform
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional, Any
+from typing import Optional, Any, Callable
 from dataclasses import dataclass
 import pickle
+import zlib
 
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
@@ -116,12 +119,56 @@ class ModelSecurity:
             self._key = base64.urlsafe_b64encode(key)
         return self._key
     
+    def process_pool(
+        self,
+        max_workers: int,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = ()
+    ) -> ProcessPoolExecutor:
+        """
+        Process pool whose workers share this instance's key.
+        
+        The key is derived once here; each worker gets a copy through the
+        pool's initargs and reads it back with worker_security(), so nothing
+        re-runs the PBKDF2 derivation. initializer(*initargs) then runs in
+        every worker as usual.
+        
+        Workers are spawned, as they always are on Windows, rather than forked
+        from a parent that may already run numba, BLAS or Qt threads.
+        """
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pool_worker,
+            initargs=(self._worker_key_material(), self.models_dir, initializer, initargs)
+        )
+    
+    def _worker_key_material(self) -> bytes:
+        """
+        Serialize the HWID and derived key for process_pool()'s initargs only.
+        
+        The blob holds the plaintext key protecting every HWID-bound model:
+        it is secret and must never be logged, printed or written to disk.
+        """
+        material = {"hwid": self.hwid, "key": self._derive_key().decode()}
+        return json.dumps(material).encode()
+    
+    @classmethod
+    def _from_worker_key_material(cls, blob: bytes, models_dir: Optional[Path] = None) -> "ModelSecurity":
+        """Rebuild inside a pool worker from _worker_key_material() without re-deriving the key"""
+        material = json.loads(blob)
+        security = cls(models_dir)
+        security._hwid = material["hwid"]
+        security._key = material["key"].encode()
+        return security
+    
     def encrypt_model(
         self, 
         model: Any, 
         model_id: str,
         metadata: Optional[dict] = None,
-        is_shared: bool = False
+        is_shared: bool = False,
+        compress: bool = False
     ) -> SecuredModel:
         """
         Encrypt a trained ML model.
@@ -131,6 +178,7 @@ class ModelSecurity:
             model_id: Unique identifier for the model
             metadata: Optional metadata (accuracy, symbol, etc.)
             is_shared: If True, uses master key (no HWID binding)
+            compress: If True, zlib-compresses the pickle before encryption
         
         Returns:
             SecuredModel container with encrypted data
@@ -144,6 +192,11 @@ class ModelSecurity:
         # Calculate model hash for integrity check
         model_hash = hashlib.sha256(model_bytes).hexdigest()
         
+        # Tree ensembles pickle to highly repetitive node arrays
+        if compress:
+            metadata['compression'] = 'zlib'
+            model_bytes = zlib.compress(model_bytes)
+        
         # Encrypt with Fernet (AES-128-CBC with HMAC)
         if is_shared:
             # Use master key for shared models
@@ -198,6 +251,8 @@ class ModelSecurity:
             # Decrypt
             fernet = Fernet(key)
             model_bytes = fernet.decrypt(secured.encrypted_data)
+            if secured.metadata.get('compression') == 'zlib':
+                model_bytes = zlib.decompress(model_bytes)
             
             # Verify integrity
             model_hash = hashlib.sha256(model_bytes).hexdigest()
@@ -324,3 +379,21 @@ class ModelSecurity:
         
         current_hwid_hash = hashlib.sha256(self.hwid.encode()).hexdigest()
         return current_hwid_hash == secured.hwid_hash
+
+
+# The parent's ModelSecurity, rebuilt inside a process_pool() worker
+_worker_security: Optional[ModelSecurity] = None
+
+
+def _init_pool_worker(key_blob: bytes, models_dir: Path, initializer: Optional[Callable], initargs: tuple):
+    global _worker_security
+    _worker_security = ModelSecurity._from_worker_key_material(key_blob, models_dir)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def worker_security() -> ModelSecurity:
+    """The parent's ModelSecurity inside a ModelSecurity.process_pool() worker"""
+    if _worker_security is None:
+        raise RuntimeError("worker_security() is only available in ModelSecurity.process_pool() workers")
+    return _worker_security
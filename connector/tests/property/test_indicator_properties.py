@@ -0,0 +1,288 @@
+"""
+Property-based tests for the technical indicator kernels.
+
+Tests that the single-pass NumPy/Numba indicator kernels in ai.indicators
+produce the same values as the pandas expressions they replace, so models
+trained on pandas-derived features see identical inputs.
+"""
+from hypothesis import assume, given, settings
+from hypothesis import strategies as st
+import numpy as np
+import pandas as pd
+
+from ai.indicators import (
+    ewm_mean, rolling_means, rolling_mean_std, rolling_max, rolling_min, rolling_quantile,
+    rolling_mad,
+    rolling_quantiles, rsi, true_range, pct_change, diff, shift, run_length, momentum_stack,
+    zscore_columns,
+)
+
+
+price_series = st.lists(
+    st.one_of(
+        st.floats(min_value=1.0, max_value=100000.0, allow_nan=False),
+        st.just(float('nan')),
+    ),
+    min_size=1,
+    max_size=300,
+)
+
+
+class TestEwmMean:
+    """Tests for ewm_mean"""
+
+    @given(values=price_series, adjust=st.booleans())
+    @settings(max_examples=100)
+    def test_matches_pandas_ewm(self, values, adjust):
+        """ewm_mean matches Series.ewm(span).mean() for every span"""
+        spans = [5, 12, 26, 200]
+        x = np.array(values)
+        result = ewm_mean(x, spans, adjust=adjust)
+
+        assert result.shape == (len(x), len(spans))
+        for k, span in enumerate(spans):
+            expected = pd.Series(x).ewm(span=span, adjust=adjust).mean().to_numpy()
+            np.testing.assert_allclose(result[:, k], expected, rtol=1e-9, equal_nan=True)
+
+    def test_empty_input(self):
+        """Empty input yields an empty result with one column per span"""
+        assert ewm_mean(np.array([]), [5, 9]).shape == (0, 2)
+
+
+class TestRollingWindows:
+    """Tests for the rolling window kernels"""
+
+    @given(values=price_series, window=st.integers(min_value=2, max_value=30))
+    @settings(max_examples=100)
+    def test_mean_std_match_pandas(self, values, window):
+        """rolling_mean_std matches rolling(w).mean() and rolling(w).std()"""
+        x = np.array(values)
+        mean, std = rolling_mean_std(x, window)
+        rolling = pd.Series(x).rolling(window)
+
+        np.testing.assert_allclose(mean, rolling.mean().to_numpy(), rtol=1e-7, atol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(std, rolling.std().to_numpy(), rtol=1e-6, atol=1e-6, equal_nan=True)
+
+    @given(
+        values=st.lists(st.floats(min_value=1.0, max_value=100000.0), min_size=40, max_size=120),
+        spike=st.floats(min_value=1e8, max_value=1e12),
+        window=st.integers(min_value=2, max_value=20),
+    )
+    @settings(max_examples=100)
+    def test_std_recovers_after_outlier_leaves(self, values, spike, window):
+        """Once an outlier leaves the window, rolling_mean_std matches the exact window std"""
+        x = np.array(values)
+        x[0] = spike
+        _, std = rolling_mean_std(x, window)
+        exact = np.array([np.std(x[i - window + 1:i + 1], ddof=1) for i in range(window, len(x))])
+
+        np.testing.assert_allclose(std[window:], exact, rtol=1e-8, atol=1e-6)
+
+    @given(values=price_series, windows=st.lists(st.integers(min_value=1, max_value=30), min_size=1, max_size=4))
+    @settings(max_examples=100)
+    def test_multi_window_means_match_pandas(self, values, windows):
+        """rolling_means matches rolling(w).mean() for every window"""
+        x = np.array(values)
+        result = rolling_means(x, windows)
+
+        for k, window in enumerate(windows):
+            expected = pd.Series(x).rolling(window).mean().to_numpy()
+            np.testing.assert_allclose(result[:, k], expected, rtol=1e-9, equal_nan=True)
+
+    @given(values=price_series, window=st.integers(min_value=1, max_value=30))
+    @settings(max_examples=100)
+    def test_min_max_match_pandas(self, values, window):
+        """rolling_min/rolling_max match rolling(w).min()/max()"""
+        x = np.array(values)
+        rolling = pd.Series(x).rolling(window)
+
+        np.testing.assert_array_equal(rolling_max(x, window), rolling.max().to_numpy())
+        np.testing.assert_array_equal(rolling_min(x, window), rolling.min().to_numpy())
+
+    @given(
+        values=price_series,
+        window=st.integers(min_value=1, max_value=30),
+        q=st.sampled_from([0.25, 0.5, 0.75, 0.8]),
+    )
+    @settings(max_examples=100)
+    def test_quantile_matches_pandas(self, values, window, q):
+        """rolling_quantile matches rolling(w).quantile(q)"""
+        x = np.array(values)
+        expected = pd.Series(x).rolling(window).quantile(q).to_numpy()
+
+        np.testing.assert_allclose(rolling_quantile(x, window, q), expected, rtol=1e-9, equal_nan=True)
+
+    @given(values=price_series, window=st.integers(min_value=1, max_value=30))
+    @settings(max_examples=100)
+    def test_multi_quantiles_match_pandas(self, values, window):
+        """rolling_quantiles matches rolling(w).quantile(q) for every q"""
+        qs = [0.25, 0.75]
+        x = np.array(values)
+        result = rolling_quantiles(x, window, qs)
+
+        for k, q in enumerate(qs):
+            expected = pd.Series(x).rolling(window).quantile(q).to_numpy()
+            np.testing.assert_allclose(result[:, k], expected, rtol=1e-9, equal_nan=True)
+
+    @given(values=price_series, window=st.integers(min_value=1, max_value=30))
+    @settings(max_examples=100)
+    def test_mad_matches_pandas_apply(self, values, window):
+        """rolling_mad matches the rolling(w).apply mean-absolute-deviation lambda"""
+        x = np.array(values)
+        expected = pd.Series(x).rolling(window).apply(lambda w: np.abs(w - w.mean()).mean()).to_numpy()
+
+        np.testing.assert_allclose(rolling_mad(x, window), expected, rtol=1e-9, atol=1e-8, equal_nan=True)
+
+
+class TestTrueRange:
+    """Tests for true_range"""
+
+    @given(
+        bars=st.lists(
+            st.tuples(
+                st.floats(min_value=1.0, max_value=1000.0),
+                st.floats(min_value=0.0, max_value=50.0),
+                st.floats(min_value=0.0, max_value=1.0),
+            ),
+            min_size=1,
+            max_size=100,
+        )
+    )
+    @settings(max_examples=100)
+    def test_matches_pandas_concat_max(self, bars):
+        """true_range matches the pandas concat/max formulation"""
+        low = pd.Series([b[0] for b in bars])
+        high = low + [b[1] for b in bars]
+        close = low + (high - low) * [b[2] for b in bars]
+        expected = pd.concat(
+            [high - low, abs(high - close.shift()), abs(low - close.shift())], axis=1
+        ).max(axis=1)
+
+        np.testing.assert_allclose(true_range(high, low, close), expected.to_numpy())
+
+
+class TestRsi:
+    """Tests for the fused RSI kernel"""
+
+    @given(values=price_series, period=st.integers(min_value=2, max_value=20), eps=st.sampled_from([0.0, 1e-10]))
+    @settings(max_examples=100)
+    def test_matches_pandas_rsi(self, values, period, eps):
+        """rsi matches the pandas where/rolling-mean RSI recipe"""
+        close = pd.Series(values)
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0).rolling(period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = 100 - (100 / (1 + gain / (loss + eps)))
+
+            np.testing.assert_allclose(rsi(close, period, eps), expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+
+class TestSeriesHelpers:
+    """Tests for the shift/diff/pct_change helpers"""
+
+    @given(values=price_series, k=st.integers(min_value=1, max_value=10))
+    @settings(max_examples=100)
+    def test_match_pandas(self, values, k):
+        """shift, diff and pct_change match their Series counterparts"""
+        x = np.array(values)
+        series = pd.Series(x)
+
+        np.testing.assert_array_equal(shift(x, k), series.shift(k).to_numpy())
+        np.testing.assert_array_equal(shift(x, -k), series.shift(-k).to_numpy())
+        np.testing.assert_array_equal(diff(x, k), series.diff(k).to_numpy())
+        np.testing.assert_allclose(
+            pct_change(x, k), series.pct_change(k, fill_method=None).to_numpy(), equal_nan=True
+        )
+
+    @given(values=price_series)
+    @settings(max_examples=100)
+    def test_momentum_stack_matches_pct_change(self, values):
+        """Each momentum_stack column is exactly pct_change(lag) * 100"""
+        lags = [1, 2, 4, 8]
+        for dtype in (np.float64, np.float32):
+            x = np.array(values, dtype=dtype)
+            result = momentum_stack(x, lags)
+
+            assert result.shape == (len(x), len(lags))
+            for k, lag in enumerate(lags):
+                np.testing.assert_array_equal(result[:, k], pct_change(x, lag) * 100)
+
+
+class TestRunLength:
+    """Tests for run_length"""
+
+    @given(flags=st.lists(st.booleans(), max_size=200))
+    @settings(max_examples=100)
+    def test_matches_groupby_cumcount(self, flags):
+        """run_length matches the groupby/cumcount idiom it replaces"""
+        s = pd.Series(flags, dtype=bool)
+        expected = s.groupby((~s).cumsum()).cumcount().to_numpy()
+
+        np.testing.assert_array_equal(run_length(np.array(flags, dtype=bool)), expected)
+
+
+class TestZscoreColumns:
+    """Tests for zscore_columns"""
+
+    @given(values=price_series)
+    @settings(max_examples=100)
+    def test_matches_pandas_normalization(self, values):
+        """Columns are z-scored like (s - s.mean()) / s.std()"""
+        x = np.array(values)
+        assume(np.count_nonzero(~np.isnan(x)) >= 2)
+        # Near-constant columns are down to rounding noise either way
+        assume(np.nanstd(x) > 1e-6 * np.nanmax(x, initial=0.0))
+        arr = np.asfortranarray(np.column_stack([x, x[::-1] * 2]))
+        expected = np.column_stack([
+            ((s - s.mean()) / s.std()).to_numpy() for s in (pd.Series(arr[:, 0]), pd.Series(arr[:, 1]))
+        ])
+
+        np.testing.assert_allclose(zscore_columns(arr), expected, rtol=1e-9, atol=1e-9)
+
+    def test_flat_columns_unchanged(self):
+        """Constant, single-value and all-NaN columns are left as they are"""
+        arr = np.asfortranarray(np.array([
+            [2.0, np.nan, np.nan],
+            [2.0, 5.0, np.nan],
+            [2.0, np.nan, np.nan],
+        ]))
+        expected = arr.copy()
+
+        np.testing.assert_array_equal(zscore_columns(arr), expected)
+
+    @given(values=price_series)
+    @settings(max_examples=50)
+    def test_selected_columns_match_per_column_calls(self, values):
+        """Normalizing chosen columns in one call equals one call per column slice"""
+        x = np.array(values)
+        arr = np.asfortranarray(np.column_stack([x, x * 3, x[::-1], x + 1]))
+        expected = arr.copy(order='F')
+        for j in (0, 2):
+            zscore_columns(expected[:, j:j + 1])
+
+        np.testing.assert_array_equal(zscore_columns(arr, [0, 2]), expected)
+
+
+class TestFloat32Inputs:
+    """Tests that float32 inputs stay float32"""
+
+    def test_kernels_preserve_float32(self):
+        """Kernels return float32 for float32 input"""
+        x = np.linspace(100.0, 200.0, 50, dtype=np.float32)
+
+        assert ewm_mean(x, [5]).dtype == np.float32
+        assert all(a.dtype == np.float32 for a in rolling_mean_std(x, 10))
+        assert rolling_max(x, 10).dtype == np.float32
+        assert rolling_min(x, 10).dtype == np.float32
+        assert rolling_quantile(x, 10, 0.8).dtype == np.float32
+
+    def test_float32_close_to_float64(self):
+        """float32 results stay within float32 precision of float64 results"""
+        x = np.cumsum(np.random.default_rng(0).normal(0, 1, 500)) + 1000.0
+        np.testing.assert_allclose(
+            ewm_mean(x.astype(np.float32), [12, 26]), ewm_mean(x, [12, 26]), rtol=1e-5
+        )
+        np.testing.assert_allclose(
+            rolling_mean_std(x.astype(np.float32), 20)[0], rolling_mean_std(x, 20)[0], rtol=1e-5
+        )
@@ -0,0 +1,97 @@
+"""
+Property-based tests for encrypted model storage.
+
+Tests that models survive the encrypt/save/load/decrypt round trip
+unchanged, with and without payload compression, so compressed models
+stay interchangeable with existing uncompressed ones.
+"""
+from hypothesis import given, settings, HealthCheck
+from hypothesis import strategies as st
+import pytest
+
+from security.model_security import ModelSecurity, worker_security
+
+
+def _decrypt_in_worker(secured):
+    return worker_security().decrypt_model(secured)
+
+
+model_payloads = st.dictionaries(
+    keys=st.text(min_size=1, max_size=10),
+    values=st.one_of(
+        st.integers(),
+        st.floats(allow_nan=False),
+        st.lists(st.floats(allow_nan=False), max_size=200),
+        st.text(max_size=50),
+    ),
+    max_size=10,
+)
+
+
+@pytest.fixture
+def security(tmp_path):
+    return ModelSecurity(models_dir=tmp_path)
+
+
+class TestModelRoundTrip:
+    """Tests for the encrypt/decrypt round trip"""
+
+    @given(payload=model_payloads, compress=st.booleans(), is_shared=st.booleans())
+    @settings(max_examples=100, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_round_trip_preserves_model(self, security, payload, compress, is_shared):
+        """Decrypting a saved model returns an equal object"""
+        secured = security.encrypt_model(payload, 'model', {'symbol': 'BTCUSD'},
+                                         is_shared=is_shared, compress=compress)
+        security.save_secured_model(secured)
+
+        loaded = security.load_secured_model('model')
+
+        assert security.decrypt_model(loaded) == payload
+
+    def test_compression_shrinks_repetitive_models(self, security):
+        """Repetitive payloads such as tree node arrays are stored compressed"""
+        payload = {'thresholds': [0.5] * 10000}
+
+        plain = security.encrypt_model(payload, 'plain')
+        packed = security.encrypt_model(payload, 'packed', compress=True)
+
+        assert packed.metadata['compression'] == 'zlib'
+        assert len(packed.encrypted_data) < len(plain.encrypted_data) / 4
+        assert packed.model_hash == plain.model_hash
+
+    def test_tampered_payload_is_rejected(self, security):
+        """A compressed model whose hash does not match fails the integrity check"""
+        secured = security.encrypt_model({'a': 1}, 'model', compress=True)
+        secured.model_hash = '0' * 64
+
+        assert security.decrypt_model(secured) is None
+
+
+class TestKeyMaterialTransfer:
+    """Tests for handing key material to worker processes"""
+
+    @given(payload=model_payloads, compress=st.booleans())
+    @settings(max_examples=100, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_worker_copy_decrypts_parent_models(self, security, tmp_path, payload, compress):
+        """A copy rebuilt from _worker_key_material() decrypts models the original encrypted"""
+        secured = security.encrypt_model(payload, 'model', compress=compress)
+
+        copy = ModelSecurity._from_worker_key_material(security._worker_key_material(), models_dir=tmp_path)
+
+        assert copy.hwid == security.hwid
+        assert copy.decrypt_model(secured) == payload
+
+    def test_pool_workers_decrypt_parent_models(self, security):
+        """worker_security() in a process_pool() worker decrypts models the parent encrypted"""
+        secured = [security.encrypt_model({'w': [1.5, 2.5]}, 'model', compress=compress)
+                   for compress in (False, True)]
+
+        with security.process_pool(1) as executor:
+            decrypted = list(executor.map(_decrypt_in_worker, secured))
+
+        assert decrypted == [{'w': [1.5, 2.5]}] * 2
+
+    def test_worker_security_outside_a_pool_worker_raises(self):
+        """Outside a process_pool() worker there is no parent key to hand out"""
+        with pytest.raises(RuntimeError):
+            worker_security()
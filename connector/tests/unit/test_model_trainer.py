@@ -0,0 +1,63 @@
+"""
+Unit tests for ModelTrainer.
+
+Tests the HistGradientBoosting path of ModelTrainer.train: it trains on
+the sample data used when MT5 is unavailable, scores with walk-forward
+CV, and reports no impurity importances.
+"""
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+import ai.model_trainer as model_trainer
+from ai.model_trainer import ModelTrainer
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_trainer, 'MT5_AVAILABLE', False)
+    return ModelTrainer(models_dir=tmp_path)
+
+
+class TestHistGradientBoostingPath:
+    """Tests for train(model_cls=HistGradientBoostingClassifier)"""
+
+    @pytest.fixture
+    def trained(self, trainer):
+        return trainer.train('BTCUSD', days=30, model_cls=HistGradientBoostingClassifier,
+                             params={'max_iter': 20})
+
+    def test_trains_hist_gradient_boosting(self, trained):
+        """The requested model class is fitted with the HIST_GB_PARAMS defaults"""
+        model, metrics = trained
+
+        assert isinstance(model, HistGradientBoostingClassifier)
+        assert model.max_iter == 20
+        assert model.max_bins == ModelTrainer.HIST_GB_PARAMS['max_bins']
+        assert metrics['model_type'] == 'HistGradientBoostingClassifier'
+
+    def test_scores_with_walk_forward_cv(self, trained):
+        """Boosting has no out-of-bag estimate, so cv_mean/cv_std are real fold statistics"""
+        _, metrics = trained
+
+        assert metrics['oob_score'] is None
+        assert 0.0 <= metrics['cv_mean'] <= 1.0
+        assert metrics['cv_std'] > 0.0
+
+    def test_feature_importance_falls_back_to_empty(self, trained):
+        """HistGradientBoosting exposes no impurity importances"""
+        _, metrics = trained
+
+        assert metrics['feature_importance'] == {}
+
+
+class TestRandomForestPath:
+    """Tests for the default RandomForestClassifier path"""
+
+    def test_oob_score_kept_apart_from_cv(self, trainer):
+        """Out-of-bag accuracy is reported separately from the walk-forward CV score"""
+        model, metrics = trainer.train('BTCUSD', days=30, params={'n_estimators': 50})
+
+        assert isinstance(model, RandomForestClassifier)
+        assert metrics['oob_score'] == pytest.approx(model.oob_score_)
+        assert metrics['cv_std'] > 0.0
+        assert set(metrics['feature_importance']) == set(ModelTrainer.FEATURE_COLUMNS)
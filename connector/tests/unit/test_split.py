@@ -0,0 +1,41 @@
+"""
+Unit tests for the trainers' chronological split and scaling helper.
+"""
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from ai._split import chrono_split_scale
+
+
+class TestChronoSplitScale:
+    """Tests for chrono_split_scale"""
+
+    def test_matches_unshuffled_train_test_split(self):
+        """Same rows on each side as train_test_split(shuffle=False), scaled on train only"""
+        rng = np.random.default_rng(0)
+        X = rng.normal(5.0, 3.0, size=(101, 4))
+        y = rng.integers(0, 3, size=101)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+        expected = StandardScaler().fit(X_train)
+        expected_train = expected.transform(X_train)
+        expected_test = expected.transform(X_test)
+
+        scaler = StandardScaler()
+        got_train, got_test, got_y_train, got_y_test = chrono_split_scale(X, y, scaler)
+
+        np.testing.assert_array_equal(got_y_train, y_train)
+        np.testing.assert_array_equal(got_y_test, y_test)
+        np.testing.assert_allclose(scaler.mean_, expected.mean_)
+        np.testing.assert_allclose(got_train, expected_train, rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(got_test, expected_test, rtol=1e-6, atol=1e-6)
+
+    def test_models_get_float32(self):
+        """Both scaled halves are float32"""
+        X = np.arange(40, dtype=np.float64).reshape(20, 2)
+        y = np.zeros(20, dtype=np.int64)
+
+        X_train, X_test, _, _ = chrono_split_scale(X, y, StandardScaler(), test_size=0.25)
+
+        assert X_train.dtype == np.float32 and X_test.dtype == np.float32
+        assert len(X_train) == 15 and len(X_test) == 5
@@ -0,0 +1,29 @@
+"""
+Unit tests for the trainers' XGBoost helpers.
+"""
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import log_loss
+
+from ai._xgb import device_params, fit_early_stopped
+
+
+class TestFitEarlyStopped:
+    """Tests for fit_early_stopped"""
+
+    def test_stops_on_the_training_tail_and_returns_a_cpu_model(self):
+        """Early stopping runs on the held-out tail and the fitted model predicts on the CPU"""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(400, 3)).astype(np.float32)
+        y = (X[:, 0] + rng.normal(scale=2.0, size=400) > 0).astype(np.int64)
+        model = xgb.XGBClassifier(n_estimators=200, learning_rate=0.3, eval_metric='logloss',
+                                  early_stopping_rounds=5, **device_params())
+
+        fitted = fit_early_stopped(model, X, y)
+
+        assert fitted is model
+        assert fitted.best_iteration < 199
+        assert fitted.get_params()['device'] == 'cpu'
+        # The eval set was the last 10% of the rows
+        best_loss = fitted.evals_result()['validation_0']['logloss'][fitted.best_iteration]
+        assert np.isclose(log_loss(y[360:], fitted.predict_proba(X[360:])), best_loss, atol=1e-5)